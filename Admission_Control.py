@@ -0,0 +1,102 @@
+import os
+import math
+import time
+import threading
+from Deadline import *
+
+# bounded admission in front of recognition: at most PLATE_ADMISSION_CONCURRENCY
+# requests run at once and at most PLATE_ADMISSION_QUEUE wait behind them. A full
+# queue is refused right away (429); a request that waits longer than its limit is
+# refused without being processed (503). Stream frames get a shorter limit, since a
+# stale frame is worth less than the next one.
+ADMISSION_CONCURRENCY = int(os.environ.get("PLATE_ADMISSION_CONCURRENCY", 8))
+ADMISSION_QUEUE = int(os.environ.get("PLATE_ADMISSION_QUEUE", 32))
+ADMISSION_MAX_WAIT = float(os.environ.get("PLATE_ADMISSION_MAX_WAIT_MS", 5000)) / 1000.0
+STREAM_MAX_WAIT = float(os.environ.get("PLATE_STREAM_MAX_WAIT_MS", 1000)) / 1000.0
+
+class Overloaded(Exception):
+    def __init__(self, status, retry_after, message):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.message = message
+
+    def body(self):
+        return {"success": False, "message": self.message}
+
+class Admission_Control:
+    def __init__(self, concurrency=ADMISSION_CONCURRENCY, max_queue=ADMISSION_QUEUE, max_wait=ADMISSION_MAX_WAIT,
+                 stream_max_wait=STREAM_MAX_WAIT):
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.stream_max_wait = stream_max_wait
+        self.cond = threading.Condition()
+        self.queued = 0
+        self.running = 0
+        self.admitted = 0
+        self.shed_full = 0
+        self.shed_stale = 0
+        self.expired = 0
+        self.service_time = 0.0
+
+    def retry_after(self):
+        # seconds until the queue ahead has drained at the measured service time
+        return max(1, int(math.ceil(self.service_time * (self.queued + self.running) / self.concurrency)))
+
+    def admit(self, stream=False, deadline=None):
+        # cheap check on the accepting thread; returns the ticket for run()
+        with self.cond:
+            if self.queued >= self.max_queue:
+                self.shed_full += 1
+                raise Overloaded(429, self.retry_after(), "Server busy: admission queue full")
+            self.queued += 1
+            return time.time() + (self.stream_max_wait if stream else self.max_wait), deadline
+
+    def run(self, ticket, process):
+        limit, deadline = ticket
+        with self.cond:
+            try:
+                while True:
+                    # also catches requests that went stale in a front-end's executor queue
+                    if expired(deadline):
+                        self.expired += 1
+                        return DEADLINES.record(timeout_result("queue"), deadline, 0.0)
+                    remaining = limit - time.time()
+                    if remaining <= 0:
+                        self.shed_stale += 1
+                        raise Overloaded(503, self.retry_after(), "Server busy: request waited too long in queue")
+                    if self.running < self.concurrency:
+                        break
+                    self.cond.wait(remaining if deadline is None else min(remaining, deadline - time.time()))
+            finally:
+                self.queued -= 1
+            self.running += 1
+            self.admitted += 1
+        start = time.time()
+        try:
+            return process()
+        finally:
+            with self.cond:
+                self.running -= 1
+                elapsed = time.time() - start
+                self.service_time = elapsed if not self.service_time else 0.9 * self.service_time + 0.1 * elapsed
+                self.cond.notify()
+
+    def call(self, process, stream=False, deadline=None):
+        return self.run(self.admit(stream, deadline), process)
+
+    def stats(self):
+        with self.cond:
+            return {
+                "concurrency": self.concurrency,
+                "running": self.running,
+                "queue_depth": self.queued,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "shed": self.shed_full + self.shed_stale,
+                "shed_queue_full": self.shed_full,
+                "shed_stale": self.shed_stale,
+                "expired": self.expired,
+                "service_ms": 1000.0 * self.service_time,
+            }
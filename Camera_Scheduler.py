@@ -0,0 +1,203 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from Deadline import *
+
+# sits in front of a pipeline shared by many cameras: every camera keeps a short
+# latest-frame-wins queue and the workers serve cameras in weighted fair order
+# (stride scheduling on a virtual clock), never faster than the camera's fps cap.
+# A camera gets at least its weighted share of the capacity whenever it has a frame;
+# frames it sends faster than that are superseded, so its effective fps follows the
+# capacity left by the others. Requests without a camera id share one FIFO queue.
+SCHEDULER_WORKERS = int(os.environ.get("PLATE_SCHEDULER_WORKERS", 2))
+CAMERA_QUEUE = int(os.environ.get("PLATE_CAMERA_QUEUE", 1))
+# requests without a camera id come from different clients, so they are never
+# superseded; past this many queued the newest is turned away instead
+ANONYMOUS_QUEUE = int(os.environ.get("PLATE_ANONYMOUS_QUEUE", 64))
+# 0 means no cap; PLATE_CAMERA_MAX_FPS and PLATE_CAMERA_WEIGHTS take "cam:value,..."
+MAX_FPS = float(os.environ.get("PLATE_MAX_FPS", 0))
+
+def camera_map(variable):
+    return {camera: float(value) for camera, value in
+            (item.split(":", 1) for item in os.environ.get(variable, "").split(",") if item)}
+
+CAMERA_MAX_FPS = camera_map("PLATE_CAMERA_MAX_FPS")
+CAMERA_WEIGHTS = camera_map("PLATE_CAMERA_WEIGHTS")
+ACTIVE_WINDOW = 2.0
+# cameras that sent nothing for this long and have nothing queued are forgotten,
+# so per-camera state does not grow with every camera id ever seen
+CAMERA_IDLE = max(float(os.environ.get("PLATE_CAMERA_IDLE_S", 60)), ACTIVE_WINDOW)
+
+class _Camera:
+    def __init__(self, name, weight, max_fps):
+        self.name = name
+        self.weight = weight
+        self.max_fps = max_fps
+        self.queue = deque()
+        self.passed = 0.0
+        self.next_start = 0.0
+        self.last_arrival = 0.0
+        self.served = 0
+        self.dropped = 0
+        self.expired = 0
+        self.rejected = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+        self.starts = deque(maxlen=32)
+
+class Camera_Scheduler:
+    def __init__(self, pipeline, workers=SCHEDULER_WORKERS, depth=CAMERA_QUEUE, max_fps=MAX_FPS,
+                 weights=CAMERA_WEIGHTS, camera_max_fps=CAMERA_MAX_FPS, idle=CAMERA_IDLE,
+                 anonymous_depth=ANONYMOUS_QUEUE):
+        self.pipeline = pipeline
+        self.workers = workers
+        self.depth = depth
+        self.anonymous_depth = anonymous_depth
+        self.max_fps = max_fps
+        self.weights = weights
+        self.camera_max_fps = camera_max_fps
+        self.idle = idle
+        self.cameras = {}
+        self.forgotten = 0
+        self.last_sweep = 0.0
+        self.vtime = 0.0
+        self.service_time = 0.0
+        self.cond = threading.Condition()
+        for _ in range(workers):
+            threading.Thread(target=self._work, daemon=True).start()
+
+    def _camera(self, camera):
+        entry = self.cameras.get(camera)
+        if entry is None:
+            entry = self.cameras[camera] = _Camera(camera, self.weights.get(camera, 1.0),
+                                                   self.camera_max_fps.get(camera, self.max_fps))
+        return entry
+
+    def _forget_idle(self, now):
+        # a camera still inside its fps cap keeps its entry so the cap holds
+        if now - self.last_sweep < ACTIVE_WINDOW:
+            return
+        self.last_sweep = now
+        for name in [name for name, entry in self.cameras.items()
+                     if not entry.queue and now - entry.last_arrival > self.idle and now >= entry.next_start]:
+            del self.cameras[name]
+            self.forgotten += 1
+
+    def submit(self, image, camera=None, deadline=None):
+        future = Future()
+        with self.cond:
+            now = time.time()
+            self._forget_idle(now)
+            entry = self._camera(camera)
+            if camera is None and len(entry.queue) >= self.anonymous_depth:
+                entry.rejected += 1
+                future.set_result({"success": False, "message": "Error: scheduler queue is full"})
+                return future
+            if not entry.queue:
+                # an idle camera does not bank credit for the time it sent nothing
+                entry.passed = max(entry.passed, self.vtime)
+            entry.last_arrival = now
+            entry.queue.append((now, image, future, deadline))
+            while camera is not None and len(entry.queue) > self.depth:
+                _, _, stale, _ = entry.queue.popleft()
+                entry.dropped += 1
+                stale.set_result({"success": False, "message": "Frame superseded by a newer frame from the same camera"})
+            self.cond.notify()
+        return future
+
+    def process_image(self, image, camera=None, deadline=None):
+        return self.submit(image, camera, deadline).result()
+
+    def _next(self):
+        now = time.time()
+        best, wake = None, None
+        for entry in self.cameras.values():
+            # frames whose client gave up while they were queued never reach the pipeline
+            while entry.queue and expired(entry.queue[0][3]):
+                _, _, future, _ = entry.queue.popleft()
+                entry.expired += 1
+                future.set_result(timeout_result("queue"))
+            if not entry.queue:
+                continue
+            if entry.next_start > now:
+                wake = entry.next_start if wake is None else min(wake, entry.next_start)
+                continue
+            if best is None or entry.passed < best.passed:
+                best = entry
+        return best, wake
+
+    def _work(self):
+        while True:
+            with self.cond:
+                entry, wake = self._next()
+                while entry is None:
+                    self.cond.wait(None if wake is None else max(wake - time.time(), 0))
+                    entry, wake = self._next()
+                arrived, image, future, deadline = entry.queue.popleft()
+                start = time.time()
+                self.vtime = entry.passed
+                entry.passed += 1.0 / entry.weight
+                if entry.max_fps > 0:
+                    entry.next_start = start + 1.0 / entry.max_fps
+                entry.served += 1
+                entry.lag_total += start - arrived
+                entry.lag_max = max(entry.lag_max, start - arrived)
+                entry.starts.append(start)
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.pipeline.process_image(image, entry.name, deadline))
+            except Exception as e:
+                future.set_exception(e)
+            with self.cond:
+                elapsed = time.time() - start
+                self.service_time = elapsed if not self.service_time else 0.9 * self.service_time + 0.1 * elapsed
+
+    def _fair_fps(self, now):
+        # weighted share of the measured capacity, water-filled over the fps caps
+        capacity = self.workers / self.service_time if self.service_time else 0.0
+        active = [e for e in self.cameras.values() if now - e.last_arrival < ACTIVE_WINDOW]
+        shares = {}
+        while active and capacity > 0:
+            total = sum(e.weight for e in active)
+            capped = [e for e in active if 0 < e.max_fps <= capacity * e.weight / total]
+            if not capped:
+                shares.update((e.name, capacity * e.weight / total) for e in active)
+                break
+            for e in capped:
+                shares[e.name] = e.max_fps
+                capacity -= e.max_fps
+                active.remove(e)
+        return shares
+
+    def stats(self):
+        stats = self.pipeline.stats()
+        with self.cond:
+            now = time.time()
+            shares = self._fair_fps(now)
+            cameras = {}
+            for entry in self.cameras.values():
+                starts = entry.starts
+                fps = (len(starts) - 1) / (starts[-1] - starts[0]) if len(starts) > 1 and starts[-1] > starts[0] else 0.0
+                cameras["default" if entry.name is None else entry.name] = {
+                    "weight": entry.weight,
+                    "max_fps": entry.max_fps,
+                    "fair_fps": shares.get(entry.name, 0.0),
+                    "fps": fps,
+                    "queued": len(entry.queue),
+                    "served": entry.served,
+                    "dropped": entry.dropped,
+                    "expired": entry.expired,
+                    "rejected": entry.rejected,
+                    "lag_avg_ms": 1000.0 * entry.lag_total / entry.served if entry.served else 0.0,
+                    "lag_max_ms": 1000.0 * entry.lag_max,
+                }
+            stats["scheduler"] = {
+                "workers": self.workers,
+                "service_ms": 1000.0 * self.service_time,
+                "forgotten_cameras": self.forgotten,
+                "cameras": cameras,
+            }
+        return stats
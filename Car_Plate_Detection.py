@@ -1,42 +1,95 @@
 import cv2
 import numpy as np
+
+# x / 255 in double precision rounded to float32, the values blobFromImage produces
+SCALE = (np.arange(256) * (1 / 255)).reshape(1, 256).astype(np.float32)
+
+def iou(a, b):
+    x0, y0 = max(a[0], b[0]), max(a[1], b[1])
+    x1, y1 = min(a[0] + a[2], b[0] + b[2]), min(a[1] + a[3], b[1] + b[3])
+    inter = max(x1 - x0, 0) * max(y1 - y0, 0)
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / float(union) if union > 0 else 0.0
+
 class Car_Plate_Detection:
-    def __init__(self):
+    def __init__(self, weight_store=None, prefilter=None, tile_size=None, tile_overlap=0.25,
+                 coarse_size=None, refine_expand=2.0, heads="both"):
+        self.net = self.loadNet(weight_store)
+        self.prefilter = prefilter
+        # frames larger than 1.5 tiles are split into overlapping tiles; None disables tiling
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        # two-pass mode: locate at coarse_size (a multiple of 32), refine at 416 around each hit
+        self.coarse_size = coarse_size
+        self.refine_expand = refine_expand
+        # a cv2.dnn net reallocates every layer when its input size changes, so the
+        # coarse pass gets its own net instead of alternating sizes on one
+        self.coarse_net = self.loadNet(weight_store) if coarse_size is not None and coarse_size != 416 else None
+        self.two_pass = {"frames": 0, "no_candidate": 0, "refined": 0, "changed": 0}
+        # "coarse" forwards only to the 13x13 yolo head, so OpenCV never runs the
+        # upsampled 26x26 branch; "fine" reads only the 26x26 head
+        self.heads = heads
+        self.active_heads = heads
+        # steady-state buffers: input blobs per input size (grown to the largest
+        # batch seen), single-frame network outputs and output names per head set
+        self.blobs = {}
+        self.resized = {}
+        self.scaled = {}
+        self.outputs = {}
+        self.outputNames = {}
+        # (left, top, width, height) in frame coordinates of the plates the last
+        # Detect_Plates call returned, None where it found none
+        self.box = None
+        self.boxes = []
+    def loadNet(self, weight_store=None):
         modelConfiguration = "CarPlateModel/yolov3-tiny.cfg"
         modelWeights = "CarPlateModel/yolov3-tiny.backup"
-        self.net = cv2.dnn.readNetFromDarknet(modelConfiguration, modelWeights)
-        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        if weight_store is not None:
+            cfg = np.fromfile(modelConfiguration, dtype=np.uint8)
+            net = cv2.dnn.readNetFromDarknet(cfg, weight_store.darknet_weights())
+        else:
+            net = cv2.dnn.readNetFromDarknet(modelConfiguration, modelWeights)
+        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        return net
+
     def getOutputsNames(self, n):
         layersNames = n.getLayerNames()
-        return [layersNames[i[0] - 1] for i in n.getUnconnectedOutLayers()]
+        names = [layersNames[i - 1] for i in np.array(n.getUnconnectedOutLayers()).flatten()]
+        # the yolo heads come in cfg order: coarse 13x13 first, fine 26x26 second
+        if self.active_heads == "coarse":
+            return names[:1]
+        if self.active_heads == "fine":
+            return names[1:]
+        return names
 
-    def postprocess(self, fr, outs, confT, nmsT):
-        frameHeight = fr.shape[0]
-        frameWidth = fr.shape[1]
-        classIds = []
-        confidences = []
+    def collectBoxes(self, outs, left, top, frameWidth, frameHeight, confT):
+        # boxes in the coordinates of the frame the window (left, top) was cut from
         boxes = []
+        confidences = []
         for o in outs:
-            for detection in o:
-                scores = detection[5:]
-                classId = np.argmax(scores)
-                confidence = scores[classId]
-                if confidence > confT:
-                    center_x = int(detection[0] * frameWidth)
-                    center_y = int(detection[1] * frameHeight)
-                    width = int(detection[2] * frameWidth)
-                    height = int(detection[3] * frameHeight)
-                    left = int(center_x - width / 2)
-                    top = int(center_y - height / 2)
-                    classIds.append(classId)
-                    confidences.append(float(confidence))
-                    boxes.append([left, top, width, height])
-
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, confT, nmsT)
-        cropped = None
+            scores = o[:, 5:]
+            confidence = scores[np.arange(len(o)), np.argmax(scores, axis=1)]
+            found = confidence > confT
+            detection = o[found]
+            center_x = (detection[:, 0] * frameWidth).astype(int)
+            center_y = (detection[:, 1] * frameHeight).astype(int)
+            width = (detection[:, 2] * frameWidth).astype(int)
+            height = (detection[:, 3] * frameHeight).astype(int)
+            x = (center_x - width / 2).astype(int) + left
+            y = (center_y - height / 2).astype(int) + top
+            boxes.extend(np.stack([x, y, width, height], axis=1).tolist())
+            confidences.extend(confidence[found].astype(float).tolist())
+        return boxes, confidences
+
+    def postprocess(self, fr, outs, confT, nmsT):
+        boxes, confidences = self.collectBoxes(outs, 0, 0, fr.shape[1], fr.shape[0], confT)
+        return self.selectPlate(fr, boxes, confidences, confT, nmsT)
+
+    def selectBox(self, boxes, confidences, confT, nmsT):
+        indices = np.array(cv2.dnn.NMSBoxes(boxes, confidences, confT, nmsT)).flatten()
+        selected = None
         for i in indices:
-            i = i[0]
             box = boxes[i]
             left = max(box[0], 0)
             top = max(box[1], 0)
@@ -44,17 +97,173 @@ class Car_Plate_Detection:
             height = max(box[3], 0)
             if height > width:
                 continue
+            selected = (left, top, width, height)
+
+        return len(indices) > 0, selected
+
+    def selectPlate(self, fr, boxes, confidences, confT, nmsT):
+        found, box = self.selectBox(boxes, confidences, confT, nmsT)
+        cropped = None
+        if box is not None:
+            left, top, width, height = box
             cropped = fr[top:(top + height), left:(left + width)]
+        self.box = box
 
-        return len(indices) > 0, cropped
-    def Detect_Plate(self, frame):
-        blob = cv2.dnn.blobFromImage(frame, 1 / 255, (416, 416), [0, 0, 0], 1, crop=False)
-        self.net.setInput(blob)
-        run = self.net.forward(self.getOutputsNames(self.net))
-        rec, plateImg = self.postprocess(frame, run, 0.5, 0.5)
+        return found, cropped
+    def checkPlate(self, rec, plateImg):
         x = np.array([2])
         if rec > 0 and type(plateImg) == type(x) and plateImg.all() is not None:
             cv2.imwrite("Plates From Model/0.png", plateImg.astype(np.uint8))
             return plateImg
 
-        return False
\ No newline at end of file
+        return False
+
+    def blob(self, images, size):
+        # same as blobFromImages(images, 1/255, (size, size), swapRB=1) but filled
+        # in place: resize into a uint8 buffer, scale through a lookup table into a
+        # float buffer, then copy the planes into the blob in RGB order
+        if any(im.dtype != np.uint8 or im.ndim != 3 or im.shape[2] != 3 for im in images):
+            return cv2.dnn.blobFromImages(images, 1 / 255, (size, size), [0, 0, 0], 1, crop=False)
+        if size not in self.blobs or len(self.blobs[size]) < len(images):
+            self.blobs[size] = np.empty((len(images), 3, size, size), np.float32)
+            self.resized[size] = np.empty((size, size, 3), np.uint8)
+            self.scaled[size] = np.empty((size, size, 3), np.float32)
+        blob, resized, scaled = self.blobs[size], self.resized[size], self.scaled[size]
+        for i, image in enumerate(images):
+            cv2.resize(image, (size, size), dst=resized)
+            cv2.LUT(resized, SCALE, dst=scaled)
+            np.copyto(blob[i], scaled.transpose(2, 0, 1)[::-1])
+        return blob[:len(images)]
+
+    def forward(self, images, size=416):
+        # the returned outputs are views of reused buffers, valid until the next forward
+        net = self.coarse_net if self.coarse_net is not None and size == self.coarse_size else self.net
+        net.setInput(self.blob(images, size))
+        if self.active_heads not in self.outputNames:
+            self.outputNames[self.active_heads] = self.getOutputsNames(self.net)
+        names = self.outputNames[self.active_heads]
+        # forward copies into outputs passed back in; the python binding reads a 3D
+        # batch output as a multichannel 2D Mat, so only single frames can reuse them
+        key = (size, self.active_heads)
+        if len(images) == 1 and key in self.outputs:
+            run = net.forward(names, self.outputs[key])
+        else:
+            run = net.forward(names)
+            if len(images) == 1:
+                self.outputs[key] = run
+        # outputs are 2D for a single image and 3D for a batch
+        run = [o.reshape(len(images), -1, o.shape[-1]) for o in run]
+        return [[o[i] for o in run] for i in range(len(images))]
+
+    def tiles(self, length):
+        tile = min(self.tile_size, length)
+        step = max(int(tile * (1 - self.tile_overlap)), 1)
+        starts = list(range(0, length - tile + 1, step))
+        if starts[-1] + tile < length:
+            starts.append(length - tile)
+        return [(s, tile) for s in starts]
+
+    def needsTiling(self, frame):
+        return self.tile_size is not None and max(frame.shape[:2]) > 1.5 * self.tile_size
+
+    def tileWindows(self, frame):
+        h, w = frame.shape[:2]
+        return [(0, 0, w, h)] + [(x, y, tw, th) for y, th in self.tiles(h) for x, tw in self.tiles(w)]
+
+    def hasCandidate(self, frame):
+        # a tiled frame is checked window by window: shrunk whole to the prefilter's
+        # width, the distant plates tiling is for would vanish
+        if self.prefilter is None:
+            return True
+        return self.prefilter.has_candidate(frame, self.tileWindows(frame) if self.needsTiling(frame) else None)
+
+    def Detect_Plate_Tiled(self, frame):
+        # the whole frame keeps near plates, the tiles keep distant ones readable;
+        # all windows go through one batched forward pass and one global NMS
+        windows = self.tileWindows(frame)
+        crops = [frame[y:y + th, x:x + tw] for x, y, tw, th in windows]
+        boxes, confidences = [], []
+        for (x, y, tw, th), outs in zip(windows, self.forward(crops)):
+            b, c = self.collectBoxes(outs, x, y, tw, th, 0.5)
+            boxes.extend(b)
+            confidences.extend(c)
+        rec, plateImg = self.selectPlate(frame, boxes, confidences, 0.5, 0.5)
+        return self.checkPlate(rec, plateImg)
+
+    def refineWindow(self, box, frameWidth, frameHeight):
+        # square window, so the 416x416 refine input does not squash a wide plate;
+        # near an edge it is shifted back inside the frame before clipping
+        left, top, width, height = box
+        cx, cy = left + width / 2.0, top + height / 2.0
+        side = int(max(width, height) * self.refine_expand)
+        x0 = max(min(int(cx - side / 2.0), frameWidth - side), 0)
+        y0 = max(min(int(cy - side / 2.0), frameHeight - side), 0)
+        return x0, y0, min(side, frameWidth - x0), min(side, frameHeight - y0)
+
+    def Detect_Plates_Two_Pass(self, frames):
+        # cheap low-resolution pass to find the plate, full-resolution pass only
+        # on an expanded window around each candidate, batched over all frames
+        plates = [False] * len(frames)
+        self.refined_boxes = [None] * len(frames)
+        coarse = []
+        windows = []
+        for i, outs in enumerate(self.forward(frames, self.coarse_size)):
+            h, w = frames[i].shape[:2]
+            boxes, confidences = self.collectBoxes(outs, 0, 0, w, h, 0.5)
+            indices = np.array(cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.5)).flatten()
+            coarse.append(self.selectBox(boxes, confidences, 0.5, 0.5)[1])
+            for j in indices:
+                x, y, ww, wh = self.refineWindow(boxes[j], w, h)
+                if ww > 0 and wh > 0:
+                    windows.append((i, x, y, ww, wh))
+        self.two_pass["frames"] += len(frames)
+        self.two_pass["no_candidate"] += len(frames) - len(set(i for i, _, _, _, _ in windows))
+
+        refined = [([], []) for _ in frames]
+        if windows:
+            crops = [frames[i][y:y + wh, x:x + ww] for i, x, y, ww, wh in windows]
+            for (i, x, y, ww, wh), outs in zip(windows, self.forward(crops)):
+                boxes, confidences = self.collectBoxes(outs, x, y, ww, wh, 0.5)
+                refined[i][0].extend(boxes)
+                refined[i][1].extend(confidences)
+
+        for i, frame in enumerate(frames):
+            boxes, confidences = refined[i]
+            found, box = self.selectBox(boxes, confidences, 0.5, 0.5)
+            if found:
+                self.two_pass["refined"] += 1
+            else:
+                box = coarse[i]
+            if (box is None) != (coarse[i] is None) or (box is not None and iou(box, coarse[i]) < 0.5):
+                self.two_pass["changed"] += 1
+            if box is not None:
+                left, top, width, height = box
+                plates[i] = self.checkPlate(True, frame[top:(top + height), left:(left + width)])
+                self.refined_boxes[i] = box
+        return plates
+
+    def Detect_Plates(self, frames, heads=None):
+        self.active_heads = heads or self.heads
+        plates = [False] * len(frames)
+        boxes = [None] * len(frames)
+        # frames the prefilter clearly finds no plate in skip the network
+        keep = [i for i, frame in enumerate(frames) if self.hasCandidate(frame)]
+        tiled = [i for i in keep if self.needsTiling(frames[i])]
+        for i in tiled:
+            plates[i] = self.Detect_Plate_Tiled(frames[i])
+            boxes[i] = self.box
+        keep = [i for i in keep if i not in tiled]
+        if keep and self.coarse_size is not None:
+            for i, plate, box in zip(keep, self.Detect_Plates_Two_Pass([frames[i] for i in keep]), self.refined_boxes):
+                plates[i] = plate
+                boxes[i] = box
+        elif keep:
+            for i, outs in zip(keep, self.forward([frames[i] for i in keep])):
+                rec, plateImg = self.postprocess(frames[i], outs, 0.5, 0.5)
+                plates[i] = self.checkPlate(rec, plateImg)
+                boxes[i] = self.box
+        self.boxes = [None if isinstance(plate, bool) else box for plate, box in zip(plates, boxes)]
+        return plates
+
+    def Detect_Plate(self, frame, heads=None):
+        return self.Detect_Plates([frame], heads)[0]
\ No newline at end of file
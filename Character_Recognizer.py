@@ -1,19 +1,24 @@
 import cv2
 import numpy as np
 from keras.models import model_from_json
+from Compiled_Inference import *
+from Plate_Glyphs import *
 
 class Character_Recognizer:
+    arabic_characters = LETTERS
 
-    def __init__(self):
-        self.arabic_characters = ['alf', 'beh', 'teh', 'theh', 'gem', 'hah', 'khah', 'dal', 'zal',
-                                  'reh', 'zen', 'sen', 'shen', 'sad', 'daad', 'tah', 'zah', 'een',
-                                  'gheen', 'feh', 'qaaf', 'kaf', 'lam', 'mem', 'noon', 'heeh', 'waw', 'yeh']
+    def __init__(self, weight_store=None):
         json_file = open("Characters Model/character model json.json", 'r')
         loaded_model_json = json_file.read()
         json_file.close()
         self.loaded_model = model_from_json(loaded_model_json)
         # load weights into new model
-        self.loaded_model.load_weights("Characters Model/character weights.h5")
+        if weight_store is not None:
+            weight_store.load_model(self.loaded_model, "characters")
+        else:
+            self.loaded_model.load_weights("Characters Model/character weights.h5")
+        self.infer = Compiled_Inference(self.loaded_model, (32, 32, 1))
+        self.second_pass = Second_Pass()
 
     def get_sides(self, length):
         if length%2==0:
@@ -50,9 +55,16 @@ class Character_Recognizer:
         character = np.expand_dims(character , axis = 2)
         return character
 
+    def predict_batch(self, imgs):
+        batch = np.array([self.preprocess(img) for img in imgs], np.float32)
+        return self.infer(batch)
+
+    def ocr_top_k(self, imgs, k=3):
+        pred = self.second_pass.refine(self.predict_batch, imgs, self.predict_batch(imgs))
+        return top_k(pred, self.arabic_characters, k)
+
+    def ocr_batch(self, imgs):
+        return [best[0][0] for best in self.ocr_top_k(imgs, 1)]
+
     def ocr(self, img):
-        # img  = cv2.cvtColor(img,cv2.COLOR_RGB2GRAY)
-        img  = self.preprocess(img)
-        img = img.reshape(-1,32, 32, 1)
-        pred = self.loaded_model.predict([[img]])
-        return self.arabic_characters[np.argmax(pred)]
\ No newline at end of file
+        return self.ocr_batch([img])[0]
@@ -0,0 +1,145 @@
+import os
+import threading
+import cv2
+import numpy as np
+import tensorflow as tf
+
+BATCH_BUCKETS = (1, 4, 8, 16)
+# glyphs whose two best classes are closer than this get a second pass over jittered
+# copies; 0 keeps every glyph at one pass
+SECOND_PASS_MARGIN = float(os.environ.get("PLATE_SECOND_PASS_MARGIN", 0.2))
+# (dx, dy, border): shifted by dx, dy pixels, then cropped by border pixels a side
+# (padded when negative); glyphs are white on black
+JITTER = ((-1, 0, 0), (1, 0, 0), (0, -1, 0), (0, 1, 0), (0, 0, 1), (0, 0, -2))
+
+def jitter(img, dx, dy, border):
+    h, w = img.shape[:2]
+    if dx or dy:
+        img = cv2.warpAffine(img, np.float32([[1, 0, dx], [0, 1, dy]]), (w, h))
+    if border > 0 and min(h, w) > 2 * border + 1:
+        img = img[border:h - border, border:w - border]
+    elif border < 0:
+        img = cv2.copyMakeBorder(img, -border, -border, -border, -border, cv2.BORDER_CONSTANT, value=0)
+    return img
+
+def margins(pred):
+    # top-1 minus top-2 probability of every row
+    if pred.shape[1] < 2:
+        return np.ones(len(pred), np.float32)
+    top = np.partition(pred, -2, axis=1)
+    return top[:, -1] - top[:, -2]
+
+def top_k(pred, labels, k):
+    # [(label, probability)] best first, for every row
+    order = np.argsort(-pred, axis=1)[:, :k]
+    return [[(labels[j], float(p[j])) for j in row] for p, row in zip(pred, order)]
+
+class Second_Pass:
+    def __init__(self, margin=SECOND_PASS_MARGIN, jitters=JITTER):
+        self.margin = margin
+        self.jitters = jitters
+        self.glyphs = 0
+        self.ambiguous_glyphs = 0
+        self.changed = 0
+        self._lock = threading.Lock()
+
+    def ambiguous(self, pred):
+        if self.margin <= 0 or not len(pred):
+            return np.zeros(0, np.int64)
+        return np.flatnonzero(margins(pred) < self.margin)
+
+    def variants(self, imgs, indices):
+        return [jitter(imgs[i], *j) for i in indices for j in self.jitters]
+
+    def merge(self, pred, indices, variant_pred):
+        # ambiguous rows become the mean over the original and its jittered copies
+        if len(indices):
+            before = np.argmax(pred[indices], axis=1)
+            pred = pred.copy()
+            pred[indices] = (pred[indices] + variant_pred.reshape(len(indices), len(self.jitters), -1).sum(axis=1)) \
+                / (len(self.jitters) + 1)
+            changed = int(np.count_nonzero(np.argmax(pred[indices], axis=1) != before))
+        else:
+            changed = 0
+        with self._lock:
+            self.glyphs += len(pred)
+            self.ambiguous_glyphs += len(indices)
+            self.changed += changed
+        return pred
+
+    def refine(self, predict, imgs, pred):
+        indices = self.ambiguous(pred)
+        return self.merge(pred, indices, predict(self.variants(imgs, indices)) if len(indices) else None)
+
+    def stats(self):
+        with self._lock:
+            return {"margin": self.margin, "glyphs": self.glyphs, "second_pass": self.ambiguous_glyphs,
+                    "second_pass_rate": self.ambiguous_glyphs / self.glyphs if self.glyphs else 0.0,
+                    "changed": self.changed}
+
+class Compiled_Inference:
+    def __init__(self, model, input_shape, buckets=BATCH_BUCKETS):
+        self.model = model
+        self.input_shape = tuple(input_shape)
+        self.buckets = tuple(sorted(buckets))
+        self.n_outputs = model.output_shape[-1]
+        self.traces = 0
+        self.calls = 0
+        self.bucket_hits = dict((b, 0) for b in self.buckets)
+        self._lock = threading.Lock()
+        self._function = tf.function(self._forward)
+        # one concrete function per padded batch size, traced on first use: the
+        # pipeline runs the fused graph, so standalone recognizers mostly never call these
+        self.functions = {}
+
+    def _forward(self, x):
+        # python side effects only run while tracing
+        self.traces += 1
+        return self.model(x, training=False)
+
+    def bucket_for(self, n):
+        for b in self.buckets:
+            if n <= b:
+                return b
+        return self.buckets[-1]
+
+    def function_for(self, bucket):
+        function = self.functions.get(bucket)
+        if function is None:
+            with self._lock:
+                if bucket not in self.functions:
+                    spec = tf.TensorSpec((bucket,) + self.input_shape, tf.float32)
+                    self.functions[bucket] = self._function.get_concrete_function(spec)
+                function = self.functions[bucket]
+        return function
+
+    def __call__(self, batch):
+        batch = np.asarray(batch, dtype=np.float32).reshape((-1,) + self.input_shape)
+        largest = self.buckets[-1]
+        outputs = []
+        for start in range(0, len(batch), largest):
+            chunk = batch[start:start + largest]
+            bucket = self.bucket_for(len(chunk))
+            padded = np.zeros((bucket,) + self.input_shape, np.float32)
+            padded[:len(chunk)] = chunk
+            with self._lock:
+                self.calls += 1
+                self.bucket_hits[bucket] += 1
+            pred = self.function_for(bucket)(tf.constant(padded))
+            outputs.append(pred.numpy()[:len(chunk)])
+        if not outputs:
+            return np.zeros((0, self.n_outputs), np.float32)
+        return np.concatenate(outputs)
+
+    def stats(self):
+        with self._lock:
+            calls = self.calls
+            hits = dict(self.bucket_hits)
+            graphs = len(self.functions)
+        return {
+            "calls": calls,
+            "bucket_hits": hits,
+            "bucket_hit_rates": dict((b, hits[b] / calls if calls else 0.0) for b in hits),
+            "graphs": graphs,
+            "retraces": self.traces - graphs,
+        }
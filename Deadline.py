@@ -0,0 +1,54 @@
+import time
+import threading
+
+# clients send the milliseconds they will still wait for an answer; the front-ends
+# turn it into an absolute time.time() deadline that every stage checks before it
+# starts, so an abandoned request stops at the next stage boundary
+DEADLINE_HEADER = "X-Deadline-Ms"
+STAGES = ("queue", "decode", "detection", "segmentation", "ocr")
+
+def deadline_after(ms):
+    return time.time() + float(ms) / 1000.0 if ms else None
+
+def expired(deadline):
+    return deadline is not None and time.time() >= deadline
+
+def timeout_result(stage):
+    return {"success": False, "message": f"Deadline exceeded before {stage}", "stage": stage}
+
+class Deadline_Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.expired = dict.fromkeys(STAGES, 0)
+        self.late = 0
+        self.wasted = 0.0
+
+    def record(self, result, deadline, elapsed):
+        # elapsed is the time spent processing the request; it is wasted when the
+        # request ran out of time after work had started, or finished past its deadline
+        if deadline is None:
+            return result
+        with self._lock:
+            self.requests += 1
+            stage = result.get("stage")
+            if stage in self.expired:
+                self.expired[stage] += 1
+                if stage not in ("queue", "decode"):
+                    self.wasted += elapsed
+            elif time.time() > deadline:
+                self.late += 1
+                self.wasted += elapsed
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "expired": dict(self.expired),
+                "late": self.late,
+                "wasted_ms": 1000.0 * self.wasted,
+            }
+
+# one per process, shared by the front-ends, the admission queue and the scheduler
+DEADLINES = Deadline_Stats()
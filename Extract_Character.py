@@ -23,8 +23,50 @@ class Extract_Characters:
         resized_character= sorted(resized_character,key=lambda x: x[1])
         return resized_character
 
+    def cropCharacters(self, binary_img, stats, labels, offset):
+        resized_character = []
+        for i in labels:
+          x, y, w, h = stats[i, :4]
+          source = binary_img[y-10:y+h+10,x:x+w]
+          source = cv2.resize(source, (32,32))
+          source = cv2.resize(source, (16,16))
+          source = cv2.copyMakeBorder(source,8,8,8,8,0)
+          resized_character.append((source, x - offset))
+        resized_character= sorted(resized_character,key=lambda x: x[1])
+        return resized_character
+
+    def extractHalves(self, img):
+        # same result as extractCharacters on each half, but with one labelling pass:
+        # the halves are thresholded apart (Otsu picks a level per half) and laid
+        # out with a background column between them so no component can cross
+        gray_img = cv2.cvtColor(img, cv2.COLOR_RGB2GRAY)
+        height, width = gray_img.shape
+        half = width // 2
+        binary_img = np.zeros((height, width + 1), np.uint8)
+        binary_img[:, :half] = ~cv2.threshold(gray_img[:, :half],0,255,cv2.THRESH_BINARY+cv2.THRESH_OTSU)[1]
+        binary_img[:, half+1:] = ~cv2.threshold(gray_img[:, half:],0,255,cv2.THRESH_BINARY+cv2.THRESH_OTSU)[1]
+        nb_components, output, stats, centroids = cv2.connectedComponentsWithStats(binary_img, connectivity=4)
+
+        # label 0 is the shared background; replace it with each half's own background box
+        left, right = [], []
+        for side, columns in ((left, slice(0, half)), (right, slice(half + 1, width + 1))):
+          background = binary_img[:, columns] == 0
+          rows = np.flatnonzero(background.any(axis=1))
+          cols = np.flatnonzero(background.any(axis=0))
+          if len(rows):
+            side.append((cols[0] + columns.start, rows[0], cols[-1] - cols[0] + 1, rows[-1] - rows[0] + 1))
+        boxes = np.array(left + right + [tuple(stats[0, :4])], np.int64).reshape(-1, 4)
+        stats = np.concatenate((boxes, stats[1:, :4].astype(np.int64)))
+        w = stats[:, cv2.CC_STAT_WIDTH]
+        h = stats[:, cv2.CC_STAT_HEIGHT]
+        keep = (h <= 80) & (h >= 20) & (w >= 15) & (w < 30)
+        keep[len(left) + len(right)] = False
+        is_left = stats[:, cv2.CC_STAT_LEFT] < half
+        labels = np.arange(len(stats))
+        return (self.cropCharacters(binary_img, stats, labels[keep & is_left], 0),
+                self.cropCharacters(binary_img, stats, labels[keep & ~is_left], half + 1))
+
     def extract(self, original_img):
         resized_img = cv2.resize(original_img, (200, 150))
-        resized_num_character = self.extractCharacters(resized_img[:, 0:100])
-        resized_char_character = self.extractCharacters(resized_img[:, 100:])
+        resized_num_character, resized_char_character = self.extractHalves(resized_img)
         return [x[0] for x in resized_num_character], [x[0] for x in resized_char_character]
\ No newline at end of file
@@ -0,0 +1,136 @@
+import os
+import mmap
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# single-writer ring of fixed-size uint8 frame slots in shared memory. A capture
+# process writes frames in place, any number of inference processes attach by name
+# and read them as numpy views without copying. Every slot carries a sequence
+# marker: 2*seq+1 while frame seq is being written, 2*seq+2 once it is complete,
+# so a reader can tell when the frame it holds was overwritten under it.
+RING_SLOTS = int(os.environ.get("PLATE_RING_SLOTS", 8))
+RING_SLOT_BYTES = int(os.environ.get("PLATE_RING_SLOT_BYTES", 1920 * 1080 * 3))
+HEADER = 3  # slots, slot_bytes, next sequence number
+FIELDS = 4  # marker, height, width, channels (0 for grayscale)
+
+def _header_bytes(slots):
+    return ((HEADER + slots * FIELDS) * 8 + 63) // 64 * 64
+
+class Frame_Ring:
+    def __init__(self, name=None, slots=RING_SLOTS, slot_bytes=RING_SLOT_BYTES, create=True):
+        self.shm = None
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True,
+                                                  size=_header_bytes(slots) + slots * slot_bytes)
+            self.name = self.shm.name
+            self.buf = self.shm.buf
+        else:
+            # map the segment directly: SharedMemory would register it with this
+            # process's resource tracker, which unlinks it when the reader exits
+            fd = os.open(os.path.join("/dev/shm", name.lstrip("/")), os.O_RDWR)
+            try:
+                self.map = mmap.mmap(fd, 0)
+            finally:
+                os.close(fd)
+            self.name = name
+            self.buf = memoryview(self.map)
+            slots, slot_bytes = (int(v) for v in np.ndarray((2,), np.int64, buffer=self.buf))
+        self.owner = create
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.offset = _header_bytes(slots)
+        self.header = np.ndarray((HEADER + slots * FIELDS,), np.int64, buffer=self.buf)
+        if create:
+            self.header[:] = 0
+            self.header[0] = slots
+            self.header[1] = slot_bytes
+        # reader side counters, per process
+        self.dropped = 0
+        self.torn = 0
+
+    def _meta(self, seq):
+        start = HEADER + (seq % self.slots) * FIELDS
+        return self.header[start:start + FIELDS]
+
+    def _view(self, seq, shape):
+        return np.ndarray(shape, np.uint8, buffer=self.buf,
+                          offset=self.offset + (seq % self.slots) * self.slot_bytes)
+
+    def head(self):
+        return int(self.header[2])
+
+    def begin(self, shape):
+        # writable view of the next slot, e.g. for VideoCapture.read(image=view)
+        if int(np.prod(shape)) > self.slot_bytes:
+            raise ValueError("frame of shape %s exceeds ring slot size" % (shape,))
+        seq = self.head()
+        meta = self._meta(seq)
+        meta[0] = 2 * seq + 1
+        meta[1:] = (shape[0], shape[1], shape[2] if len(shape) > 2 else 0)
+        return seq, self._view(seq, shape)
+
+    def commit(self, seq):
+        self._meta(seq)[0] = 2 * seq + 2
+        self.header[2] = seq + 1
+
+    def write(self, frame):
+        seq, view = self.begin(frame.shape)
+        view[...] = frame
+        del view
+        self.commit(seq)
+        return seq
+
+    def valid(self, seq):
+        return int(self._meta(seq)[0]) == 2 * seq + 2
+
+    def read(self, seq):
+        # a view into the slot, or None when frame seq is not (or no longer) there;
+        # check valid(seq) again once done with the view
+        meta = self._meta(seq)
+        if int(meta[0]) != 2 * seq + 2:
+            return None
+        height, width, channels = (int(v) for v in meta[1:])
+        view = self._view(seq, (height, width, channels) if channels else (height, width))
+        return view if self.valid(seq) else None
+
+    def frames(self, drop_stale=True, after=-1, poll=0.002):
+        # yields (seq, view) as frames are committed; with drop_stale a slow reader
+        # jumps to the newest frame, otherwise it reads every frame still in the ring
+        while True:
+            head = self.head()
+            if head - 1 <= after:
+                time.sleep(poll)
+                continue
+            seq = head - 1 if drop_stale else max(after + 1, head - self.slots + 1)
+            self.dropped += seq - after - 1
+            after = seq
+            view = self.read(seq)
+            if view is None:
+                self.torn += 1
+                continue
+            yield seq, view
+
+    def stats(self):
+        return {"name": self.name, "slots": self.slots, "written": self.head(),
+                "dropped": self.dropped, "torn": self.torn}
+
+    def close(self):
+        self.header = None
+        self.buf = None
+        if self.owner:
+            self.shm.close()
+            self.shm.unlink()
+        else:
+            self.map.close()
+
+def recognize(ring, pipeline, camera=None, drop_stale=True):
+    # inference worker loop: reads frames in place and yields (seq, read) for every
+    # frame that was not overwritten while it was being recognized
+    for seq, frame in ring.frames(drop_stale):
+        read = pipeline.process_image(frame, camera)
+        del frame
+        if ring.valid(seq):
+            yield seq, read
+        else:
+            ring.torn += 1
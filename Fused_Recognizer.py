@@ -0,0 +1,152 @@
+import sys
+import threading
+import cv2
+import numpy as np
+import tensorflow as tf
+from keras.layers import Input
+from keras.models import Model
+from Compiled_Inference import BATCH_BUCKETS
+from Character_Recognizer import *
+from digit_recognizer_ import *
+
+class Fused_Recognizer:
+    def __init__(self, nr=None, cr=None, buckets=BATCH_BUCKETS):
+        self.nr = nr if nr is not None else Number_Recognizer()
+        self.cr = cr if cr is not None else Character_Recognizer()
+        self.buckets = tuple(sorted(buckets))
+        # the trained networks are nested as-is, so both heads share their weights
+        digits_model = self.nr.loaded_model
+        characters_model = self.cr.loaded_model
+        digits_in = Input(shape=(28, 28, 1), name="digits")
+        characters_in = Input(shape=(32, 32, 1), name="characters")
+        self.model = Model(inputs=[digits_in, characters_in],
+                           outputs=[digits_model(digits_in), characters_model(characters_in)],
+                           name="fused_recognizer")
+        self.traces = 0
+        self.calls = 0
+        self._lock = threading.Lock()
+        self._function = tf.function(self._forward)
+        # every (digits, characters) bucket pair is traced up front, so requests only
+        # look their graph up and never trace or wait on each other
+        self.functions = {}
+        for db in self.buckets:
+            for cb in self.buckets:
+                self.functions[(db, cb)] = self._function.get_concrete_function(
+                    tf.TensorSpec((db, 28, 28, 1), tf.float32),
+                    tf.TensorSpec((cb, 32, 32, 1), tf.float32))
+        # ambiguous digits and letters share one jittered batch
+        self.second_pass = Second_Pass()
+
+    def _forward(self, digits, characters):
+        self.traces += 1
+        return self.model([digits, characters], training=False)
+
+    def bucket_for(self, n):
+        for b in self.buckets:
+            if n <= b:
+                return b
+        return self.buckets[-1]
+
+    def function_for(self, digits_bucket, characters_bucket):
+        with self._lock:
+            self.calls += 1
+        return self.functions[(digits_bucket, characters_bucket)]
+
+    def pad(self, batch, bucket, shape):
+        padded = np.zeros((bucket,) + shape, np.float32)
+        padded[:len(batch)] = batch
+        return padded
+
+    def predict_batch(self, numbers, characters):
+        if not len(numbers) and not len(characters):
+            return (np.zeros((0, len(self.nr.arabic_digit)), np.float32),
+                    np.zeros((0, len(self.cr.arabic_characters)), np.float32))
+        digits = np.array([self.nr.preprocess(img) for img in numbers], np.float32).reshape(-1, 28, 28, 1)
+        chars = np.array([self.cr.preprocess(img) for img in characters], np.float32).reshape(-1, 32, 32, 1)
+        largest = self.buckets[-1]
+        digits_out, chars_out = [], []
+        for start in range(0, max(len(digits), len(chars), 1), largest):
+            d = digits[start:start + largest]
+            c = chars[start:start + largest]
+            db, cb = self.bucket_for(len(d)), self.bucket_for(len(c))
+            pd, pc = self.function_for(db, cb)(tf.constant(self.pad(d, db, (28, 28, 1))),
+                                               tf.constant(self.pad(c, cb, (32, 32, 1))))
+            digits_out.append(pd.numpy()[:len(d)])
+            chars_out.append(pc.numpy()[:len(c)])
+        return np.concatenate(digits_out), np.concatenate(chars_out)
+
+    def ocr(self, numbers, characters):
+        digits, letters, _, _ = self.ocr_with_confidence(numbers, characters)
+        return digits, letters
+
+    def ocr_with_confidence(self, numbers, characters):
+        # labels plus the probability of each chosen label
+        digits, letters = self.ocr_top_k(numbers, characters, 1)
+        return ([d[0][0] for d in digits], [c[0][0] for c in letters],
+                [d[0][1] for d in digits], [c[0][1] for c in letters])
+
+    def ocr_top_k(self, numbers, characters, k=3):
+        # one pass for every glyph, then one more over jittered copies of the ambiguous ones
+        pd, pc = self.predict_batch(numbers, characters)
+        di, ci = self.second_pass.ambiguous(pd), self.second_pass.ambiguous(pc)
+        if len(di) or len(ci):
+            vd, vc = self.predict_batch(self.second_pass.variants(numbers, di), self.second_pass.variants(characters, ci))
+        else:
+            vd = vc = None
+        pd, pc = self.second_pass.merge(pd, di, vd), self.second_pass.merge(pc, ci, vc)
+        return top_k(pd, self.nr.arabic_digit, k), top_k(pc, self.cr.arabic_characters, k)
+
+    def verify_parity(self, numbers, characters):
+        # the fused graph must reproduce the standalone networks bit for bit
+        pd, pc = self.predict_batch(numbers, characters)
+        return (np.array_equal(pd, self.nr.predict_batch(numbers)) and
+                np.array_equal(pc, self.cr.predict_batch(characters)))
+
+    def stats(self):
+        with self._lock:
+            stats = {"calls": self.calls, "graphs": len(self.functions),
+                     "retraces": self.traces - len(self.functions)}
+        stats["second_pass"] = self.second_pass.stats()
+        return stats
+
+def synthetic_glyphs(rng, n):
+    # white strokes on black at the sizes Extract_Characters cuts out
+    glyphs = []
+    for _ in range(n):
+        img = np.zeros((int(rng.integers(10, 60)), int(rng.integers(6, 40))), np.uint8)
+        for _ in range(int(rng.integers(1, 4))):
+            h, w = img.shape
+            cv2.line(img, (int(rng.integers(0, w)), int(rng.integers(0, h))),
+                     (int(rng.integers(0, w)), int(rng.integers(0, h))), 255, int(rng.integers(1, 4)))
+        glyphs.append(img)
+    return glyphs
+
+if __name__ == '__main__':
+    from Extract_Character import *
+    from Car_Plate_Detection import *
+    fr = Fused_Recognizer()
+    ok = True
+    # every (digits, characters) bucket pair, the chunking past the largest bucket
+    # and empty sides, on synthetic glyphs: no detector weights or test images needed
+    rng = np.random.default_rng(0)
+    sizes = (0, 1, 3, 4, 5, 8, 9, 16, 17, 40)
+    for n_digits in sizes:
+        for n_characters in sizes:
+            numbers, characters = synthetic_glyphs(rng, n_digits), synthetic_glyphs(rng, n_characters)
+            if not fr.verify_parity(numbers, characters):
+                ok = False
+                print("PARITY MISMATCH with %d digits, %d characters" % (n_digits, n_characters))
+    print("synthetic batches: %s, %s" % ("parity ok" if ok else "PARITY MISMATCH", fr.stats()))
+    if len(sys.argv) > 1:
+        Ec = Extract_Characters()
+        cp = Car_Plate_Detection()
+        for path in sys.argv[1:]:
+            PlateImg = cp.Detect_Plate(cv2.imread(path))
+            if isinstance(PlateImg, bool):
+                continue
+            numbers, characters = Ec.extract(PlateImg)
+            same = fr.verify_parity(numbers, characters)
+            ok = ok and same
+            print(path, "parity ok" if same else "PARITY MISMATCH", fr.ocr_top_k(numbers, characters, 2))
+    print("second pass:", fr.second_pass.stats())
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,149 @@
+import os
+import time
+import queue
+import itertools
+import multiprocessing
+import multiprocessing.connection
+from multiprocessing import shared_memory
+import numpy as np
+from Deadline import *
+
+# frames are copied once into a shared-memory slot; only (ticket, slot, shape, dtype,
+# camera, deadline) descriptors travel over the queue
+HOST_SLOTS = int(os.environ.get("PLATE_HOST_SLOTS", 8))
+HOST_SLOT_BYTES = int(os.environ.get("PLATE_HOST_SLOT_BYTES", 3840 * 2160 * 3))
+HOST_MAX_BATCH = int(os.environ.get("PLATE_HOST_MAX_BATCH", 8))
+HOST_BATCH_WAIT = float(os.environ.get("PLATE_HOST_BATCH_WAIT_MS", 2)) / 1000.0
+# longest a request waits for a free slot plus its read (or until its deadline)
+HOST_TIMEOUT = float(os.environ.get("PLATE_HOST_TIMEOUT_S", 30))
+# how often a waiting request checks that the host process is still running
+HOST_POLL = 1.0
+
+def _serve(shm, slot_bytes, requests, results, max_batch, batch_wait, batches, frames, ready):
+    # the only process that imports TensorFlow and owns the models
+    from Plate_Pipeline import Plate_Pipeline
+    pipeline = Plate_Pipeline()
+    ready.set()
+    running = True
+    while running:
+        item = requests.get()
+        if item is None:
+            break
+        batch = [item]
+        deadline = time.time() + batch_wait
+        while len(batch) < max_batch:
+            try:
+                item = requests.get(timeout=max(deadline - time.time(), 0))
+            except queue.Empty:
+                break
+            if item is None:
+                running = False
+                break
+            batch.append(item)
+        images = [np.ndarray(shape, np.dtype(dtype), buffer=shm.buf, offset=slot * slot_bytes)
+                  for _, slot, shape, dtype, _, _ in batch]
+        reads = pipeline.process_batch(images, [camera for _, _, _, _, camera, _ in batch],
+                                       [deadline for _, _, _, _, _, deadline in batch])
+        del images
+        with batches.get_lock():
+            batches.value += 1
+        with frames.get_lock():
+            frames.value += len(batch)
+        for (ticket, slot, _, _, _, _), read in zip(batch, reads):
+            results[slot].put((ticket, read))
+
+class Inference_Host:
+    def __init__(self, slots=HOST_SLOTS, slot_bytes=HOST_SLOT_BYTES, max_batch=HOST_MAX_BATCH,
+                 batch_wait=HOST_BATCH_WAIT, timeout=HOST_TIMEOUT):
+        # create before forking the front-end workers so they inherit the queues
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        # a request that gave up leaves its read behind in the slot's queue; tickets
+        # let the next user of the slot skip it
+        self.tickets = itertools.count()
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free = multiprocessing.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+        self.requests = multiprocessing.Queue()
+        self.results = [multiprocessing.Queue() for _ in range(slots)]
+        self.batches = multiprocessing.Value('L', 0)
+        self.frames = multiprocessing.Value('L', 0)
+        self.ready = multiprocessing.Event()
+        self.process = None
+
+    def start(self):
+        self.process = multiprocessing.Process(
+            target=_serve, daemon=True,
+            args=(self.shm, self.slot_bytes, self.requests, self.results, self.max_batch,
+                  self.batch_wait, self.batches, self.frames, self.ready))
+        self.process.start()
+        return self
+
+    def stop(self):
+        if self.process is not None:
+            self.requests.put(None)
+            self.process.join()
+            self.process = None
+        self.shm.close()
+        self.shm.unlink()
+
+    def alive(self):
+        # the sentinel works in forked front-end workers too; is_alive() only in the parent
+        return self.process is not None and not multiprocessing.connection.wait([self.process.sentinel], 0)
+
+    def _wait(self, q, until):
+        # q.get() that gives up at until or as soon as the host process is gone
+        while True:
+            if not self.alive():
+                raise RuntimeError("inference host is not running")
+            remaining = until - time.time()
+            if remaining <= 0:
+                raise RuntimeError("timed out waiting for the inference host")
+            try:
+                return q.get(timeout=min(remaining, HOST_POLL))
+            except queue.Empty:
+                pass
+
+    def process_image(self, image, camera=None, deadline=None):
+        if image.nbytes > self.slot_bytes:
+            return {"success": False, "message": "Error processing image: frame exceeds inference host slot size"}
+        until = time.time() + self.timeout
+        if deadline is not None:
+            until = min(until, deadline)
+        try:
+            slot = self._wait(self.free, until)
+        except RuntimeError as e:
+            if expired(deadline):
+                return timeout_result("queue")
+            return {"success": False, "message": f"Error processing image: {e}"}
+        try:
+            ticket = (os.getpid(), next(self.tickets))
+            view = np.ndarray(image.shape, image.dtype, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+            view[...] = image
+            del view
+            self.requests.put((ticket, slot, image.shape, image.dtype.str, camera, deadline))
+            while True:
+                done, read = self._wait(self.results[slot], until)
+                if done == ticket:
+                    return read
+        except RuntimeError as e:
+            return {"success": False, "message": f"Error processing image: {e}"}
+        finally:
+            self.free.put(slot)
+
+    def stats(self):
+        batches, frames = self.batches.value, self.frames.value
+        return {
+            "host": {
+                "ready": self.ready.is_set(),
+                "alive": self.alive(),
+                "slots": self.slots,
+                "batches": batches,
+                "frames": frames,
+                "avg_batch": frames / batches if batches else 0.0
+            }
+        }
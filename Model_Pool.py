@@ -0,0 +1,57 @@
+import time
+import queue
+import threading
+from contextlib import contextmanager
+
+class Model_Pool:
+    def __init__(self, factory, size):
+        self.size = size
+        self.instances = [factory() for _ in range(size)]
+        self._free = queue.Queue()
+        for instance in self.instances:
+            self._free.put(instance)
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.checkouts = 0
+        self.waiting = 0
+        self.in_use = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.busy_total = 0.0
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        start = time.time()
+        with self._lock:
+            self.waiting += 1
+        try:
+            instance = self._free.get(timeout=timeout)
+        finally:
+            with self._lock:
+                self.waiting -= 1
+        acquired = time.time()
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.wait_total += acquired - start
+            self.wait_max = max(self.wait_max, acquired - start)
+        try:
+            yield instance
+        finally:
+            with self._lock:
+                self.in_use -= 1
+                self.busy_total += time.time() - acquired
+            self._free.put(instance)
+
+    def stats(self):
+        with self._lock:
+            elapsed = max(time.time() - self.started, 1e-9)
+            return {
+                "size": self.size,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "checkouts": self.checkouts,
+                "wait_avg_ms": 1000.0 * self.wait_total / self.checkouts if self.checkouts else 0.0,
+                "wait_max_ms": 1000.0 * self.wait_max,
+                "utilization": self.busy_total / (elapsed * self.size),
+            }
@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+
+# per-vehicle early termination: frames of one camera whose plate box overlaps the
+# previous one (IoU >= PLATE_CONSENSUS_IOU, less than PLATE_CONSENSUS_GAP_S apart)
+# belong to one track. Every OCR read of the track votes per glyph position with the
+# glyph's confidence; once PLATE_CONSENSUS_READS reads agree on the length and every
+# position's winner holds PLATE_CONSENSUS_SHARE of its votes, later frames of the
+# track skip segmentation and OCR and get the consensus plate. Every
+# PLATE_CONSENSUS_RECHECK-th frame is still read: a read differing in a glyph or two
+# votes again, a read of a different plate restarts the vote.
+CONSENSUS_READS = int(os.environ.get("PLATE_CONSENSUS_READS", 0))
+CONSENSUS_SHARE = float(os.environ.get("PLATE_CONSENSUS_SHARE", 0.8))
+CONSENSUS_IOU = float(os.environ.get("PLATE_CONSENSUS_IOU", 0.3))
+CONSENSUS_GAP = float(os.environ.get("PLATE_CONSENSUS_GAP_S", 1.0))
+CONSENSUS_RECHECK = int(os.environ.get("PLATE_CONSENSUS_RECHECK", 10))
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = min(ax + aw, bx + bw) - max(ax, bx)
+    h = min(ay + ah, by + bh) - max(ay, by)
+    if w <= 0 or h <= 0:
+        return 0.0
+    return w * h / float(aw * ah + bw * bh - w * h)
+
+class _Track:
+    def __init__(self, box, now):
+        self.box = box
+        self.last = now
+        self.reset()
+
+    def reset(self):
+        # votes[length][position][glyph] = summed confidence
+        self.votes = {}
+        self.reads = {}
+        self.plate = None
+        self.shares = None
+        self.since_check = 0
+
+    def vote(self, glyphs, confidences):
+        positions = self.votes.setdefault(len(glyphs), [{} for _ in glyphs])
+        for position, glyph, confidence in zip(positions, glyphs, confidences):
+            position[glyph] = position.get(glyph, 0.0) + confidence
+        self.reads[len(glyphs)] = self.reads.get(len(glyphs), 0) + 1
+
+    def settle(self, min_reads, min_share):
+        length = max(self.reads, key=self.reads.get)
+        if self.reads[length] < min_reads:
+            return
+        glyphs, shares = [], []
+        for position in self.votes[length]:
+            glyph = max(position, key=position.get)
+            total = sum(position.values())
+            glyphs.append(glyph)
+            shares.append(position[glyph] / total if total else 0.0)
+        if min(shares) >= min_share:
+            self.plate, self.shares = ','.join(glyphs), shares
+
+class Plate_Consensus:
+    def __init__(self, min_reads=CONSENSUS_READS, min_share=CONSENSUS_SHARE, min_iou=CONSENSUS_IOU,
+                 gap=CONSENSUS_GAP, recheck=CONSENSUS_RECHECK):
+        self.min_reads = min_reads
+        self.min_share = min_share
+        self.min_iou = min_iou
+        self.gap = gap
+        self.recheck = recheck
+        self.tracks = {}
+        self._lock = threading.Lock()
+        self.started = 0
+        self.settled = 0
+        self.restarts = 0
+        self.read_frames = 0
+        self.skipped = 0
+        self.frame_cost = 0.0
+
+    def _track(self, camera, box, now):
+        track = self.tracks.get(camera)
+        if track is None or now - track.last > self.gap or iou(track.box, box) < self.min_iou:
+            track = self.tracks[camera] = _Track(box, now)
+            self.started += 1
+        track.box, track.last = box, now
+        return track
+
+    def skip(self, camera, box, now=None):
+        # the consensus read for this frame, or None when it has to go through OCR;
+        # frames without a camera id or a plate box are never tracked
+        if camera is None or box is None:
+            return None
+        now = now or time.time()
+        with self._lock:
+            for name in [c for c, t in self.tracks.items() if now - t.last > self.gap]:
+                del self.tracks[name]
+            track = self._track(camera, box, now)
+            if track.plate is None or track.since_check + 1 >= self.recheck:
+                return None
+            track.since_check += 1
+            self.skipped += 1
+            return {"success": True, "plate_number": track.plate,
+                    "consensus": {"reads": sum(track.reads.values()), "shares": track.shares}}
+
+    def vote(self, camera, box, plate, confidences, now=None):
+        if camera is None or box is None or not plate:
+            return
+        now = now or time.time()
+        glyphs = plate.split(',')
+        with self._lock:
+            self.read_frames += 1
+            track = self._track(camera, box, now)
+            if track.plate is not None:
+                track.since_check = 0
+                if track.plate == plate:
+                    return
+                settled = track.plate.split(',')
+                if len(settled) != len(glyphs) or 2 * sum(a != b for a, b in zip(settled, glyphs)) > len(glyphs):
+                    # mostly different glyphs under the same box: a new plate, start over
+                    track.reset()
+                    self.restarts += 1
+                else:
+                    # a misread glyph or two: it votes, and the consensus holds only if it still settles
+                    track.plate = None
+            track.vote(glyphs, confidences)
+            track.settle(self.min_reads, self.min_share)
+            if track.plate is not None:
+                self.settled += 1
+
+    def cost(self, seconds_per_frame):
+        # measured segmentation + OCR time of one plate, for the CPU saved figure
+        with self._lock:
+            self.frame_cost = seconds_per_frame if not self.frame_cost else 0.9 * self.frame_cost + 0.1 * seconds_per_frame
+
+    def stats(self):
+        with self._lock:
+            saved = 1000.0 * self.skipped * self.frame_cost
+            return {
+                "tracks": self.started,
+                "open_tracks": len(self.tracks),
+                "settled": self.settled,
+                "restarts": self.restarts,
+                "ocr_frames": self.read_frames,
+                "skipped_frames": self.skipped,
+                "skip_rate": self.skipped / float(self.skipped + self.read_frames) if self.skipped + self.read_frames else 0.0,
+                "ocr_ms_per_frame": 1000.0 * self.frame_cost,
+                "saved_ms": saved,
+                "saved_ms_per_vehicle": saved / self.started if self.started else 0.0,
+            }
@@ -0,0 +1,6 @@
+# output labels of the two recognizers, in model output order; kept free of any
+# model imports so lookup and storage code can use them without TensorFlow
+DIGITS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+LETTERS = ['alf', 'beh', 'teh', 'theh', 'gem', 'hah', 'khah', 'dal', 'zal',
+           'reh', 'zen', 'sen', 'shen', 'sad', 'daad', 'tah', 'zah', 'een',
+           'gheen', 'feh', 'qaaf', 'kaf', 'lam', 'mem', 'noon', 'heeh', 'waw', 'yeh']
@@ -0,0 +1,195 @@
+import os
+import time
+from Model_Pool import *
+from Extract_Character import *
+from Character_Recognizer import *
+from digit_recognizer_ import *
+from Car_Plate_Detection import *
+from Fused_Recognizer import *
+from Plate_Prefilter import *
+from Deadline import *
+from Read_Store import *
+from Watchlist import *
+from Read_Dedup import *
+from Plate_Consensus import *
+from Weight_Store import *
+
+# cv2.dnn.Net is not safe to share between threads, so every request checks
+# an instance out of a pool; size the pools to the core count
+DETECTOR_POOL_SIZE = int(os.environ.get("PLATE_DETECTOR_POOL", 2))
+RECOGNIZER_POOL_SIZE = int(os.environ.get("PLATE_RECOGNIZER_POOL", 1))
+PREFILTER = os.environ.get("PLATE_PREFILTER") == "1"
+# split frames much larger than this many pixels into tiles so distant plates survive
+TILE_SIZE = int(os.environ["PLATE_TILE_SIZE"]) if os.environ.get("PLATE_TILE_SIZE") else None
+# locate plates at this input size first and refine at 416 only around candidates
+COARSE_SIZE = int(os.environ["PLATE_COARSE_SIZE"]) if os.environ.get("PLATE_COARSE_SIZE") else None
+# yolo heads to run: "both", "coarse" (13x13, near-field cameras) or "fine" (26x26);
+# PLATE_CAMERA_HEADS overrides it per camera, e.g. "gate-1:coarse,gate-2:coarse"
+HEADS = os.environ.get("PLATE_HEADS", "both")
+CAMERA_HEADS = dict(item.split(":", 1) for item in os.environ.get("PLATE_CAMERA_HEADS", "").split(",") if item)
+# PLATE_TOP_K=3 adds the 3 most likely labels of every glyph to a read as "alternatives"
+TOP_K = int(os.environ.get("PLATE_TOP_K", 1))
+# PLATE_WEIGHT_STORE="Weight Store" loads the models from the store written by
+# `python Weight_Store.py convert` instead of parsing the h5 and darknet files
+WEIGHT_STORE = os.environ.get("PLATE_WEIGHT_STORE")
+
+class Plate_Pipeline:
+    def __init__(self, detectors=DETECTOR_POOL_SIZE, recognizers=RECOGNIZER_POOL_SIZE, weight_store=WEIGHT_STORE,
+                 prefilter=PREFILTER, tile_size=TILE_SIZE, coarse_size=COARSE_SIZE, heads=HEADS,
+                 camera_heads=CAMERA_HEADS, read_store=READ_STORE, watchlist=WATCHLIST,
+                 dedup_window=DEDUP_WINDOW, consensus_reads=CONSENSUS_READS, top_k=TOP_K):
+        self.Ec = Extract_Characters()
+        if isinstance(weight_store, str):
+            weight_store = Weight_Store(weight_store)
+        # PLATE_READ_STORE=reads.db keeps every successful read in a local history
+        self.store = Read_Store(read_store) if read_store else None
+        # PLATE_WATCHLIST=plates.txt flags reads within PLATE_WATCHLIST_MAX_COST of a listed plate
+        self.watchlist = Watchlist(watchlist).watch() if watchlist else None
+        # PLATE_DEDUP_WINDOW_S=30 tags reads with the event (vehicle passage) they belong to
+        self.dedup = Read_Dedup(dedup_window) if dedup_window > 0 else None
+        # PLATE_CONSENSUS_READS=3 stops reading a vehicle's plate once 3 reads agree
+        self.consensus = Plate_Consensus(consensus_reads) if consensus_reads > 0 else None
+        self.prefilter = Plate_Prefilter() if prefilter else None
+        self.coarse_size = coarse_size
+        self.top_k = top_k
+        self.heads = heads
+        self.camera_heads = camera_heads
+        self.detectors = Model_Pool(
+            lambda: Car_Plate_Detection(weight_store, self.prefilter, tile_size, coarse_size=coarse_size, heads=heads),
+            detectors)
+        self.recognizers = Model_Pool(
+            lambda: Fused_Recognizer(Number_Recognizer(weight_store), Character_Recognizer(weight_store)),
+            recognizers)
+
+    def process_image(self, image, camera=None, deadline=None):
+        return self.process_batch([image], [camera], [deadline])[0]
+
+    def detect(self, images, cameras=None):
+        # frames are grouped by the yolo heads their camera is configured for
+        cameras = cameras or [None] * len(images)
+        groups = {}
+        for i, camera in enumerate(cameras):
+            groups.setdefault(self.camera_heads.get(camera, self.heads), []).append(i)
+        plates = [False] * len(images)
+        boxes = [None] * len(images)
+        with self.detectors.checkout() as cp:
+            for heads, indices in groups.items():
+                for i, plate in zip(indices, cp.Detect_Plates([images[i] for i in indices], heads)):
+                    plates[i] = plate
+                for i, box in zip(indices, cp.boxes):
+                    boxes[i] = box
+        return plates, boxes
+
+    def expire(self, results, indices, deadlines, stage):
+        # frames whose deadline passed get a timeout read and skip the stage
+        live = []
+        for i in indices:
+            if expired(deadlines[i]):
+                results[i] = timeout_result(stage)
+            else:
+                live.append(i)
+        return live
+
+    def publish(self, result, camera, confidences, box, arrived):
+        # everything that happens to a successful read
+        if self.dedup is not None:
+            result["event"] = self.dedup.observe(camera, result["plate_number"], arrived)
+        if self.watchlist is not None:
+            matches = self.watchlist.match(result["plate_number"])
+            if matches:
+                result["watchlist"] = [{"plate": plate, "cost": cost} for plate, cost in matches]
+        if self.store is not None:
+            self.store.record(camera, result["plate_number"], confidences, box, arrived)
+        return result
+
+    def process_batch(self, images, cameras=None, deadlines=None):
+        # one detector forward pass and one OCR dispatch for the whole batch
+        cameras = cameras or [None] * len(images)
+        deadlines = deadlines or [None] * len(images)
+        arrived = time.time()
+        try:
+            results = [None] * len(images)
+            live = self.expire(results, range(len(images)), deadlines, "detection")
+            plates, boxes = self.detect([images[i] for i in live], [cameras[i] for i in live]) if live else ([], [])
+
+            found = []
+            bbox = {}
+            for i, PlateImg, box in zip(live, plates, boxes):
+                if PlateImg is None or isinstance(PlateImg, bool):
+                    results[i] = {"success": False, "message": "No plate found in image"}
+                    continue
+                read = self.consensus.skip(cameras[i], box, arrived) if self.consensus is not None else None
+                if read is not None:
+                    # the vehicle's plate is already settled; no segmentation or OCR
+                    results[i] = self.publish(read, cameras[i], read["consensus"]["shares"], box, arrived)
+                else:
+                    found.append((i, PlateImg))
+                    bbox[i] = box
+
+            started = time.time()
+            glyphs = []
+            live = self.expire(results, [i for i, _ in found], deadlines, "segmentation")
+            for i, PlateImg in found:
+                if i not in live:
+                    continue
+                try:
+                    numbers, characters = self.Ec.extract(PlateImg)
+                    glyphs.append((i, numbers, characters))
+                except Exception as e:
+                    results[i] = {"success": False, "message": f"Error processing image: {str(e)}"}
+
+            live = self.expire(results, [i for i, _, _ in glyphs], deadlines, "ocr")
+            glyphs = [g for g in glyphs if g[0] in live]
+            if glyphs:
+                with self.recognizers.checkout() as fr:
+                    digits, letters = fr.ocr_top_k([n for _, numbers, _ in glyphs for n in numbers],
+                                                   [c for _, _, characters in glyphs for c in characters], self.top_k)
+                for i, numbers, characters in glyphs:
+                    best = digits[:len(numbers)] + letters[:len(characters)]
+                    digits, letters = digits[len(numbers):], letters[len(characters):]
+                    confidences = [glyph[0][1] for glyph in best]
+                    result = {"success": True, "plate_number": ','.join(glyph[0][0] for glyph in best)}
+                    if self.top_k > 1:
+                        result["alternatives"] = [[[label, p] for label, p in glyph] for glyph in best]
+                    results[i] = self.publish(result, cameras[i], confidences, bbox[i], arrived)
+                    if self.consensus is not None:
+                        self.consensus.vote(cameras[i], bbox[i], results[i]["plate_number"], confidences, arrived)
+                if self.consensus is not None:
+                    self.consensus.cost((time.time() - started) / len(glyphs))
+
+            return results
+
+        except Exception as e:
+            # one dict per frame: callers tag reads per frame
+            return [{"success": False, "message": f"Error processing image: {str(e)}"} for _ in images]
+
+    def stats(self):
+        stats = {
+            "pools": {
+                "detectors": self.detectors.stats(),
+                "recognizers": self.recognizers.stats()
+            },
+            "inference": [{
+                "digits": fr.nr.infer.stats(),
+                "characters": fr.cr.infer.stats(),
+                "fused": fr.stats()
+            } for fr in self.recognizers.instances]
+        }
+        if self.prefilter is not None:
+            stats["prefilter"] = self.prefilter.stats()
+        if self.store is not None:
+            stats["read_store"] = self.store.stats()
+        if self.dedup is not None:
+            stats["dedup"] = self.dedup.stats()
+        if self.consensus is not None:
+            stats["consensus"] = self.consensus.stats()
+        if self.watchlist is not None:
+            stats["watchlist"] = self.watchlist.stats()
+        if self.coarse_size is not None:
+            two_pass = {}
+            for cp in self.detectors.instances:
+                for key, value in cp.two_pass.items():
+                    two_pass[key] = two_pass.get(key, 0) + value
+            two_pass["changed_rate"] = two_pass["changed"] / two_pass["frames"] if two_pass["frames"] else 0.0
+            stats["two_pass"] = two_pass
+        return stats
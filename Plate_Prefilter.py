@@ -0,0 +1,97 @@
+import time
+import threading
+import cv2
+import numpy as np
+
+class Plate_Prefilter:
+    # classical check run before YOLO: a plate is a dense cluster of vertical
+    # strokes (strong horizontal gradients) inside a wide, short rectangle.
+    # Frames are looked at no smaller than the detector's 416 px input, so a plate
+    # the network could still find is not shrunk away first (tiled frames are
+    # checked tile by tile); smaller frames are used as they are
+    def __init__(self, width=416, edge_threshold=80, min_edge_density=None,
+                 min_aspect=1.3, max_aspect=7.0, min_area=0.0005, max_area=0.25, min_fill=0.12):
+        self.width = width
+        self.edge_threshold = edge_threshold
+        # the early exit may only drop frames without enough edges for even the
+        # smallest box that would pass below
+        self.min_edge_density = min_edge_density if min_edge_density is not None else min_fill * min_area
+        self.min_aspect = min_aspect
+        self.max_aspect = max_aspect
+        self.min_area = min_area
+        self.max_area = max_area
+        self.min_fill = min_fill
+        # narrow enough that a small plate is not merged with the edges of the car around it
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(width // 40, 3), 3))
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.skipped = 0
+        self.time_total = 0.0
+
+    def candidates(self, frame):
+        h, w = frame.shape[:2]
+        scale = min(self.width / float(w), 1.0)
+        # INTER_AREA would cost as much as the detector pass this is meant to skip
+        small = cv2.resize(frame, (max(int(w * scale), 1), max(int(h * scale), 1)), interpolation=cv2.INTER_LINEAR) \
+            if scale < 1.0 else frame
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gx = cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0, ksize=3))
+        edges = cv2.threshold(gx, self.edge_threshold, 255, cv2.THRESH_BINARY)[1]
+        area = float(edges.size)
+        if cv2.countNonZero(edges) < self.min_edge_density * area:
+            return []
+        closed = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, self.kernel)
+        contours = cv2.findContours(closed, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+        boxes = []
+        for c in contours:
+            x, y, bw, bh = cv2.boundingRect(c)
+            if bh == 0 or not self.min_aspect <= bw / float(bh) <= self.max_aspect:
+                continue
+            if not self.min_area <= bw * bh / area <= self.max_area:
+                continue
+            if cv2.countNonZero(edges[y:y + bh, x:x + bw]) < self.min_fill * bw * bh:
+                continue
+            boxes.append((int(x / scale), int(y / scale), int(bw / scale), int(bh / scale)))
+        return boxes
+
+    def has_candidate(self, frame, windows=None):
+        # windows: (x, y, w, h) regions checked separately, counted as one frame
+        start = time.perf_counter()
+        if windows is None:
+            found = len(self.candidates(frame)) > 0
+        else:
+            found = any(len(self.candidates(frame[y:y + h, x:x + w])) > 0 for x, y, w, h in windows)
+        with self._lock:
+            self.checked += 1
+            self.skipped += not found
+            self.time_total += time.perf_counter() - start
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "skipped": self.skipped,
+                "skip_rate": self.skipped / self.checked if self.checked else 0.0,
+                "avg_ms": 1000.0 * self.time_total / self.checked if self.checked else 0.0,
+            }
+
+def measure(prefilter, labelled):
+    # labelled: iterable of (frame, has_plate); recall is over frames with a plate
+    plates = kept = empty = skipped = 0
+    start = time.perf_counter()
+    for frame, has_plate in labelled:
+        found = len(prefilter.candidates(frame)) > 0
+        if has_plate:
+            plates += 1
+            kept += found
+        else:
+            empty += 1
+            skipped += not found
+    n = plates + empty
+    return {
+        "frames": n,
+        "recall": kept / plates if plates else 1.0,
+        "empty_skip_rate": skipped / empty if empty else 0.0,
+        "avg_ms": 1000.0 * (time.perf_counter() - start) / n if n else 0.0,
+    }
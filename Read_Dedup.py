@@ -0,0 +1,127 @@
+import os
+import math
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# collapses the reads of a vehicle standing in front of a camera into one event:
+# a read of a plate the same camera saw less than PLATE_DEDUP_WINDOW_S ago joins
+# that event (hits, last_seen) instead of starting a new one. Each camera keeps an
+# OrderedDict in last-seen order, so expired events are popped from the front, and
+# all cameras together hold at most PLATE_DEDUP_MAX_EVENTS. A Bloom filter sized for
+# PLATE_DEDUP_DAILY_PLATES answers "seen today" (any camera) in fixed memory and is
+# cleared at UTC midnight.
+DEDUP_WINDOW = float(os.environ.get("PLATE_DEDUP_WINDOW_S", 0))
+DEDUP_MAX_EVENTS = int(os.environ.get("PLATE_DEDUP_MAX_EVENTS", 100000))
+DEDUP_DAILY_PLATES = int(os.environ.get("PLATE_DEDUP_DAILY_PLATES", 1000000))
+DEDUP_FALSE_POSITIVE = float(os.environ.get("PLATE_DEDUP_FALSE_POSITIVE", 0.01))
+
+class Bloom_Filter:
+    def __init__(self, capacity, false_positive):
+        self.bits = max(8, int(-capacity * math.log(false_positive) / math.log(2) ** 2))
+        self.hashes = max(1, int(round(self.bits / capacity * math.log(2))))
+        self.array = bytearray((self.bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # double hashing over one 128-bit digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        a, b = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(a + i * b) % self.bits for i in range(self.hashes)]
+
+    def add(self, key):
+        # True when the key was (probably) already there
+        present = True
+        for bit in self._positions(key):
+            byte, mask = bit >> 3, 1 << (bit & 7)
+            if not self.array[byte] & mask:
+                present = False
+                self.array[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, key):
+        return all(self.array[bit >> 3] & (1 << (bit & 7)) for bit in self._positions(key))
+
+    def clear(self):
+        self.array = bytearray(len(self.array))
+        self.count = 0
+
+    def false_positive_rate(self):
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+class Read_Dedup:
+    def __init__(self, window=DEDUP_WINDOW, max_events=DEDUP_MAX_EVENTS, daily_plates=DEDUP_DAILY_PLATES,
+                 false_positive=DEDUP_FALSE_POSITIVE, on_close=None):
+        self.window = window
+        self.max_events = max_events
+        # on_close(event) gets every event once it can no longer grow
+        self.on_close = on_close
+        self.cameras = {}
+        self.size = 0
+        self.next_id = 0
+        self.seen = Bloom_Filter(daily_plates, false_positive)
+        self.day = int(time.time() // 86400)
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.events = 0
+        self.collapsed = 0
+        self.evicted = 0
+
+    def _close(self, event):
+        self.size -= 1
+        if self.on_close is not None:
+            self.on_close(dict(event))
+
+    def _expire(self, now):
+        for events in self.cameras.values():
+            while events and next(iter(events.values()))["last_seen"] < now - self.window:
+                self._close(events.popitem(last=False)[1])
+        while self.size > self.max_events:
+            # over the cap: close the event that has been quiet the longest
+            oldest = min((e for e in self.cameras.values() if e), key=lambda e: next(iter(e.values()))["last_seen"])
+            self._close(oldest.popitem(last=False)[1])
+            self.evicted += 1
+        for camera in [c for c, events in self.cameras.items() if not events]:
+            del self.cameras[camera]
+
+    def observe(self, camera, plate, ts=None):
+        # the event this read belongs to; "new" is True for the read that opened it
+        now = ts or time.time()
+        with self._lock:
+            self.reads += 1
+            day = int(now // 86400)
+            if day != self.day:
+                self.seen.clear()
+                self.day = day
+            self._expire(now)
+            events = self.cameras.setdefault(camera, OrderedDict())
+            event = events.get(plate)
+            if event is not None:
+                event["last_seen"] = max(event["last_seen"], now)
+                event["hits"] += 1
+                events.move_to_end(plate)
+                self.collapsed += 1
+                return dict(event, new=False)
+            self.next_id += 1
+            event = events[plate] = {"id": self.next_id, "camera": camera, "plate_number": plate,
+                                     "first_seen": now, "last_seen": now, "hits": 1,
+                                     "seen_today": self.seen.add(plate)}
+            self.size += 1
+            self.events += 1
+            return dict(event, new=True)
+
+    def flush(self, now=None):
+        # closes the events whose window has passed without waiting for the next read
+        with self._lock:
+            self._expire(now or time.time())
+
+    def stats(self):
+        with self._lock:
+            return {"window_s": self.window, "open_events": self.size, "reads": self.reads, "events": self.events,
+                    "collapsed": self.collapsed, "evicted": self.evicted,
+                    "collapse_rate": self.collapsed / self.reads if self.reads else 0.0,
+                    "bloom_plates": self.seen.count, "bloom_bytes": len(self.seen.array),
+                    "bloom_false_positive": self.seen.false_positive_rate()}
@@ -0,0 +1,289 @@
+import os
+import re
+import json
+import time
+import queue
+import sqlite3
+import threading
+from Plate_Glyphs import *
+
+# history of plate reads in SQLite (WAL), one table per UTC day so retention is
+# a DROP TABLE. record() only enqueues; a background thread writes the queue in
+# batches of up to READ_STORE_BATCH rows per transaction, and drops reads (and
+# counts them) rather than block a request when it falls behind.
+READ_STORE = os.environ.get("PLATE_READ_STORE")
+READ_STORE_RETENTION_DAYS = int(os.environ.get("PLATE_READ_RETENTION_DAYS", 30))
+READ_STORE_BATCH = int(os.environ.get("PLATE_READ_STORE_BATCH", 1000))
+READ_STORE_FLUSH = float(os.environ.get("PLATE_READ_STORE_FLUSH_MS", 200)) / 1000.0
+READ_STORE_QUEUE = int(os.environ.get("PLATE_READ_STORE_QUEUE", 100000))
+# partial-plate search: every distinct plate is indexed by the 1-3 glyph runs of its
+# digits and of its letters (a run never spans both), so "1,?,3,*" or "*,alf,beh"
+# intersects a few posting lists instead of scanning the reads
+READ_INDEX = os.environ.get("PLATE_READ_INDEX", "1") == "1"
+GRAM = 3
+# plates.last_seen is only moved once a sighting is this much newer, so it may lag
+# the newest read by up to this many seconds
+LAST_SEEN_STEP = 3600
+DAY = 86400
+
+def day_table(ts):
+    return "reads_" + time.strftime("%Y%m%d", time.gmtime(ts))
+
+def runs(glyphs):
+    # splits a glyph run where digits turn into letters
+    parts = []
+    for glyph in glyphs:
+        if parts and (parts[-1][-1] in DIGITS) == (glyph in DIGITS):
+            parts[-1].append(glyph)
+        else:
+            parts.append([glyph])
+    return parts
+
+def plate_grams(plate):
+    grams = set()
+    for part in runs(plate.split(',')):
+        for n in range(1, min(GRAM, len(part)) + 1):
+            grams.update(','.join(part[i:i + n]) for i in range(len(part) - n + 1))
+    return grams
+
+def is_pattern(plate):
+    return plate is not None and ('?' in plate or '*' in plate)
+
+def pattern_grams(pattern):
+    # the longest grams every match must contain: GRAM-glyph windows of each known
+    # run, or the whole run when it is shorter
+    grams, literal = set(), []
+    for glyph in pattern.split(',') + ['*']:
+        if glyph not in ('?', '*'):
+            literal.append(glyph)
+            continue
+        for part in runs(literal):
+            n = min(GRAM, len(part))
+            grams.update(','.join(part[i:i + n]) for i in range(len(part) - n + 1))
+        literal = []
+    return grams
+
+def pattern_regex(pattern):
+    # "?" is one glyph, "*" any number of glyphs (including none)
+    expression = ""
+    for glyph in pattern.split(','):
+        if glyph == '*':
+            expression += "(?:[^,]+,)*"
+        elif glyph == '?':
+            expression += "[^,]+,"
+        else:
+            expression += re.escape(glyph) + ","
+    return re.compile(expression)
+
+class Read_Store:
+    def __init__(self, path=READ_STORE, retention_days=READ_STORE_RETENTION_DAYS, batch=READ_STORE_BATCH,
+                 flush=READ_STORE_FLUSH, max_queue=READ_STORE_QUEUE, writer=True, index=READ_INDEX):
+        self.path = path
+        self.index = index
+        self.retention_days = retention_days
+        self.batch = batch
+        self.flush = flush
+        self.queue = queue.Queue(max_queue)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.tables = set()
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self.pruned_day = None
+        self.thread = None
+        if writer:
+            db = self._db()
+            db.execute("PRAGMA journal_mode=WAL")
+            if index:
+                self._create_index(db)
+            self.thread = threading.Thread(target=self._write, daemon=True)
+            self.thread.start()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=30)
+            db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, camera, plate, confidences=None, bbox=None, ts=None):
+        # numpy scalars from the models become plain numbers here, on the caller's thread
+        try:
+            confidences = [float(c) for c in confidences] if confidences is not None else None
+            bbox = tuple(int(v) for v in bbox) if bbox is not None else None
+            self.queue.put_nowait((float(ts or time.time()), camera, plate, confidences, bbox))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+        except (TypeError, ValueError) as e:
+            with self._lock:
+                self.errors += 1
+                self.last_error = f"record: {e}"
+
+    def _table(self, db, ts):
+        name = day_table(ts)
+        if name not in self.tables:
+            db.execute(f"CREATE TABLE IF NOT EXISTS {name} (ts REAL, camera TEXT, plate TEXT, confidences TEXT,"
+                       " x INTEGER, y INTEGER, w INTEGER, h INTEGER)")
+            db.execute(f"CREATE INDEX IF NOT EXISTS {name}_plate ON {name} (plate)")
+            db.execute(f"CREATE INDEX IF NOT EXISTS {name}_camera_ts ON {name} (camera, ts)")
+            self.tables.add(name)
+        return name
+
+    def _create_index(self, db):
+        with db:
+            db.execute("CREATE TABLE IF NOT EXISTS plates (id INTEGER PRIMARY KEY, plate TEXT UNIQUE, last_seen REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS plate_grams (gram TEXT, plate_id INTEGER,"
+                       " PRIMARY KEY (gram, plate_id)) WITHOUT ROWID")
+            if db.execute("SELECT 1 FROM plates LIMIT 1").fetchone() is None:
+                # reads stored before the index existed
+                for name in self.days(db):
+                    self._index(db, dict(db.execute(f"SELECT plate, MAX(ts) FROM {name} GROUP BY plate")))
+
+    def _index(self, db, seen):
+        # seen: {plate: last ts}; new plates get their grams, known ones a new last_seen
+        # (only once it moved by LAST_SEEN_STEP, retention is counted in days)
+        plates = list(seen)
+        known = {}
+        for i in range(0, len(plates), 500):
+            chunk = plates[i:i + 500]
+            known.update(db.execute(f"SELECT plate, last_seen FROM plates WHERE plate IN ({','.join('?' * len(chunk))})",
+                                    chunk))
+        db.executemany("UPDATE plates SET last_seen = ? WHERE plate = ?",
+                       [(seen[plate], plate) for plate, last_seen in known.items() if seen[plate] > last_seen + LAST_SEEN_STEP])
+        for plate in plates:
+            if plate not in known:
+                plate_id = db.execute("INSERT INTO plates (plate, last_seen) VALUES (?, ?)", (plate, seen[plate])).lastrowid
+                db.executemany("INSERT INTO plate_grams VALUES (?, ?)", [(gram, plate_id) for gram in plate_grams(plate)])
+
+    def _write(self):
+        db = self._db()
+        while True:
+            rows = [self.queue.get()]
+            deadline = time.time() + self.flush
+            while len(rows) < self.batch:
+                try:
+                    rows.append(self.queue.get(timeout=max(deadline - time.time(), 0)))
+                except queue.Empty:
+                    break
+            written = len(rows)
+            try:
+                self._insert(db, rows)
+            except Exception:
+                # a failed batch is retried a read at a time so only the bad reads are lost
+                for row in rows:
+                    try:
+                        self._insert(db, [row])
+                    except Exception as e:
+                        written -= 1
+                        self._failed(e)
+            with self._lock:
+                self.written += written
+                self.batches += 1
+            try:
+                self.prune(db)
+            except Exception as e:
+                self._failed(e)
+
+    def _failed(self, error):
+        with self._lock:
+            self.errors += 1
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    def _insert(self, db, rows):
+        tables, seen = {}, {}
+        for ts, camera, plate, confidences, bbox in rows:
+            seen[plate] = max(ts, seen.get(plate, ts))
+            x, y, w, h = bbox if bbox is not None else (None, None, None, None)
+            tables.setdefault(day_table(ts), []).append(
+                (ts, camera, plate, json.dumps(confidences) if confidences is not None else None, x, y, w, h))
+        with db:
+            for name, values in tables.items():
+                self._table(db, values[0][0])
+                db.executemany(f"INSERT INTO {name} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+            if self.index:
+                self._index(db, seen)
+
+    def days(self, db=None):
+        db = db or self._db()
+        return sorted(row[0] for row in db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'reads_%'"))
+
+    def prune(self, db=None):
+        # drops whole days past retention, at most once per day
+        today = day_table(time.time())
+        if self.pruned_day == today:
+            return
+        db = db or self._db()
+        oldest = day_table(time.time() - self.retention_days * DAY)
+        with db:
+            for name in self.days(db):
+                if name < oldest:
+                    db.execute(f"DROP TABLE {name}")
+                    self.tables.discard(name)
+            if self.index:
+                cutoff = time.time() - self.retention_days * DAY - LAST_SEEN_STEP
+                db.execute("DELETE FROM plate_grams WHERE plate_id IN (SELECT id FROM plates WHERE last_seen < ?)",
+                           (cutoff,))
+                db.execute("DELETE FROM plates WHERE last_seen < ?", (cutoff,))
+        self.pruned_day = today
+
+    def search(self, pattern, since=None):
+        # indexed plates matching a pattern such as "1,?,3,*" or "*,alf,beh"
+        db = self._db()
+        grams = sorted(pattern_grams(pattern))
+        if grams:
+            plates = db.execute("SELECT plate, last_seen FROM plates WHERE id IN (" + " INTERSECT ".join(
+                ["SELECT plate_id FROM plate_grams WHERE gram = ?"] * len(grams)) + ")", grams).fetchall()
+        else:
+            plates = db.execute("SELECT plate, last_seen FROM plates").fetchall()
+        regex = pattern_regex(pattern)
+        return [plate for plate, last_seen in plates
+                if (since is None or last_seen >= since - LAST_SEEN_STEP) and regex.fullmatch(plate + ",")]
+
+    def query(self, plate=None, camera=None, since=None, until=None, limit=100):
+        # newest first; only the day tables that overlap [since, until] are read.
+        # A plate with "?" (one glyph) or "*" (any glyphs) goes through the index
+        until = until or time.time()
+        since = since if since is not None else until - self.retention_days * DAY
+        names = [n for n in self.days() if day_table(since) <= n <= day_table(until)]
+        where, args = ["ts >= ?", "ts <= ?"], [since, until]
+        if is_pattern(plate):
+            if not self.index:
+                raise ValueError("Partial plate search needs the read index (PLATE_READ_INDEX=1)")
+            plates = self.search(plate, since)
+            if not plates:
+                return []
+            db = self._db()
+            db.execute("CREATE TEMP TABLE IF NOT EXISTS matched (plate TEXT PRIMARY KEY)")
+            db.execute("DELETE FROM matched")
+            db.executemany("INSERT INTO matched VALUES (?)", [(p,) for p in plates])
+            db.commit()
+            where.append("plate IN (SELECT plate FROM matched)")
+        elif plate is not None:
+            where.append("plate = ?")
+            args.append(plate)
+        if camera is not None:
+            where.append("camera = ?")
+            args.append(camera)
+        reads = []
+        for name in reversed(names):
+            rows = self._db().execute(
+                f"SELECT ts, camera, plate, confidences, x, y, w, h FROM {name} WHERE {' AND '.join(where)}"
+                " ORDER BY ts DESC LIMIT ?", args + [limit - len(reads)]).fetchall()
+            for ts, cam, plate_number, confidences, x, y, w, h in rows:
+                reads.append({"ts": ts, "camera": cam, "plate_number": plate_number,
+                              "confidences": json.loads(confidences) if confidences is not None else None,
+                              "bbox": [x, y, w, h] if x is not None else None})
+            if len(reads) >= limit:
+                break
+        return reads
+
+    def stats(self):
+        with self._lock:
+            return {"indexed": self.index, "queued": self.queue.qsize(), "written": self.written, "batches": self.batches,
+                    "dropped": self.dropped, "errors": self.errors, "last_error": self.last_error,
+                    "avg_batch": self.written / self.batches if self.batches else 0.0}
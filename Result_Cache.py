@@ -0,0 +1,151 @@
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# reads keyed by a hash of the raw request bytes (and camera), kept for ttl seconds
+# in an in-process LRU; with a path the reads are also shared through a SQLite
+# table, so worker processes answer each other's duplicates
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+def cacheable(result):
+    # failures inside the pipeline, missed deadlines and superseded frames are
+    # transient, and a dedup event changes with every read; everything else is a
+    # pure function of the request bytes
+    return "event" not in result and not result.get("message", "").startswith(("Error", "Deadline", "Frame superseded"))
+
+class Result_Cache:
+    def __init__(self, ttl=10.0, size=1024, path=None, wait=30.0):
+        self.ttl = ttl
+        self.size = size
+        self.path = path
+        # longest a duplicate waits on a computation another process claimed
+        self.wait = wait
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        if path is not None:
+            db = sqlite3.connect(path, timeout=wait)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result TEXT, expires REAL)")
+            db.execute("CREATE INDEX IF NOT EXISTS results_expires ON results (expires)")
+            db.commit()
+            db.close()
+
+    def key(self, data, camera=None):
+        h = hashlib.blake2b(digest_size=16)
+        h.update((camera or "").encode() + b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    def get_or_compute(self, data, compute, camera=None):
+        key = self.key(data, camera)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    break
+                self.coalesced += 1
+            # an identical request is already running in this process. Its result is
+            # only shared when it would be cached: a missed deadline or failure is the
+            # leader's own, so the follower runs again under its own deadline
+            flight.done.wait()
+            if flight.error is None and cacheable(flight.result):
+                return flight.result
+        try:
+            flight.result = self._shared(key, compute) if self.path is not None else self._compute(compute)
+            if cacheable(flight.result):
+                self._put(key, flight.result)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _compute(self, compute):
+        with self._lock:
+            self.misses += 1
+        return compute()
+
+    def _put(self, key, result):
+        with self._lock:
+            self._entries[key] = (time.time() + self.ttl, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = sqlite3.connect(self.path, timeout=self.wait, isolation_level=None)
+        return db
+
+    def _shared(self, key, compute):
+        # a row with a NULL result is another process's claim on the computation
+        db = self._db()
+        give_up = time.time() + self.wait
+        while True:
+            db.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = db.execute("SELECT result, expires FROM results WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[1] > now and row[0] is not None:
+                db.execute("COMMIT")
+                with self._lock:
+                    self.shared_hits += 1
+                return json.loads(row[0])
+            if row is None or row[1] <= now or now >= give_up:
+                db.execute("INSERT OR REPLACE INTO results VALUES (?, NULL, ?)", (key, now + self.wait))
+                db.execute("COMMIT")
+                break
+            db.execute("COMMIT")
+            time.sleep(0.01)
+        try:
+            result = self._compute(compute)
+        except Exception:
+            db.execute("DELETE FROM results WHERE key = ? AND result IS NULL", (key,))
+            raise
+        now = time.time()
+        if cacheable(result):
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)", (key, json.dumps(result), now + self.ttl))
+        else:
+            db.execute("DELETE FROM results WHERE key = ? AND result IS NULL", (key,))
+        db.execute("DELETE FROM results WHERE expires < ?", (now,))
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses + self.coalesced
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "hit_rate": (lookups - self.misses) / float(lookups) if lookups else 0.0,
+                "shared": self.path is not None,
+            }
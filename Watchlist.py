@@ -0,0 +1,222 @@
+import os
+import time
+import threading
+import numpy as np
+from Plate_Glyphs import *
+
+# plates are written as the API returns them, glyphs joined by commas ("1,2,3,alf,beh"),
+# one per line. Each plate is packed into one int64 (6 bits per glyph, digits first),
+# and the index is a sorted array of those, about 8 MB per million plates. Fuzzy
+# lookups enumerate every plate within max_cost of the read (digits only turn into
+# digits, letters into letters) and test them all with one searchsorted.
+WATCHLIST = os.environ.get("PLATE_WATCHLIST")
+WATCHLIST_MAX_COST = float(os.environ.get("PLATE_WATCHLIST_MAX_COST", 1.0))
+WATCHLIST_RELOAD = float(os.environ.get("PLATE_WATCHLIST_RELOAD_S", 30))
+
+SYMBOLS = DIGITS + LETTERS
+CODES = {glyph: code for code, glyph in enumerate(SYMBOLS, 1)}
+DIGIT_CODES = tuple(range(1, len(DIGITS) + 1))
+LETTER_CODES = tuple(range(len(DIGITS) + 1, len(SYMBOLS) + 1))
+BITS = 6
+MAX_GLYPHS = 10
+
+# substitution costs for glyphs the recognizers mix up; any other edit costs 1
+CONFUSABLE = {
+    ("beh", "teh"): 0.3, ("beh", "theh"): 0.3, ("teh", "theh"): 0.3, ("noon", "beh"): 0.5,
+    ("gem", "hah"): 0.4, ("gem", "khah"): 0.4, ("hah", "khah"): 0.3,
+    ("dal", "zal"): 0.3, ("reh", "zen"): 0.3, ("sen", "shen"): 0.3, ("sad", "daad"): 0.3,
+    ("tah", "zah"): 0.3, ("een", "gheen"): 0.3, ("feh", "qaaf"): 0.4,
+    ("2", "3"): 0.4, ("7", "8"): 0.4, ("0", "5"): 0.5,
+}
+
+def substitution_costs(confusable):
+    costs = {}
+    for (a, b), cost in confusable.items():
+        costs[CODES[a], CODES[b]] = costs[CODES[b], CODES[a]] = cost
+    return costs
+
+def encode(codes):
+    value = 0
+    for code in codes:
+        value = (value << BITS) | code
+    return value
+
+def decode(value):
+    glyphs = []
+    while value:
+        glyphs.append(SYMBOLS[(value & ((1 << BITS) - 1)) - 1])
+        value >>= BITS
+    return ','.join(reversed(glyphs))
+
+def parse(plate):
+    # glyph codes of a plate string, or None when it is not a digits-then-letters plate
+    try:
+        codes = tuple(CODES[glyph.strip()] for glyph in plate.split(',') if glyph.strip())
+    except KeyError:
+        return None
+    digits = sum(1 for code in codes if code in DIGIT_CODES)
+    if not codes or len(codes) > MAX_GLYPHS or any(code in DIGIT_CODES for code in codes[digits:]):
+        return None
+    return codes
+
+class Watchlist:
+    def __init__(self, path=WATCHLIST, max_cost=WATCHLIST_MAX_COST, confusable=CONFUSABLE):
+        self.path = path
+        self.max_cost = max_cost
+        self.costs = substitution_costs(confusable)
+        self.min_cost = min(list(self.costs.values()) + [1.0])
+        # same-class replacements of every glyph, cheapest first
+        self.substitutions = {code: sorted(((other, self.costs.get((code, other), 1.0))
+                                            for other in (DIGIT_CODES if code in DIGIT_CODES else LETTER_CODES)
+                                            if other != code), key=lambda s: s[1])
+                              for code in CODES.values()}
+        # readers only ever see a complete sorted array; writers build a new one and swap it in
+        self.index = np.zeros(0, np.int64)
+        self._write = threading.Lock()
+        self._lock = threading.Lock()
+        self.mtime = None
+        self.invalid = 0
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_time = 0.0
+        self.reloads = 0
+        if path is not None:
+            self.reload()
+
+    def __len__(self):
+        return len(self.index)
+
+    def read(self, path):
+        values, invalid = [], 0
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                codes = parse(line)
+                if codes is None:
+                    invalid += 1
+                else:
+                    values.append(encode(codes))
+        return np.unique(np.array(values, np.int64)), invalid
+
+    def reload(self, path=None):
+        # re-reads the file when it changed; lookups keep using the old index meanwhile
+        path = path or self.path
+        mtime = os.path.getmtime(path)
+        with self._write:
+            if mtime == self.mtime and path == self.path:
+                return False
+            index, invalid = self.read(path)
+            self.index, self.invalid, self.mtime, self.path = index, invalid, mtime, path
+            self.reloads += 1
+        return True
+
+    def update(self, add=(), remove=()):
+        # in-memory change without re-reading the list; it is not written to the file,
+        # so the next reload() after the file changes replaces it with the file's plates
+        add = np.array([encode(c) for c in map(parse, add) if c is not None], np.int64)
+        remove = np.array([encode(c) for c in map(parse, remove) if c is not None], np.int64)
+        with self._write:
+            self.index = np.setdiff1d(np.union1d(self.index, add), remove)
+
+    def watch(self, interval=WATCHLIST_RELOAD):
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except OSError:
+                    pass
+        threading.Thread(target=poll, daemon=True).start()
+        return self
+
+    def neighbours(self, codes, max_cost):
+        # packed value -> cheapest cost of every plate within max_cost of codes; edits
+        # are applied to the packed value directly and a plate is only unpacked again
+        # when enough budget is left to edit it further. As in weighted Levenshtein a
+        # glyph is replaced at most once: locked has a bit for every position already
+        # substituted or inserted, so noon -> beh -> teh cannot undercut noon -> teh
+        best = {encode(codes): 0.0}
+        expanded = {}
+        frontier = [(codes, 0, 0.0)]
+        while frontier:
+            following = []
+            for seq, locked, spent in frontier:
+                n, value = len(seq), encode(seq)
+                digits = sum(1 for code in seq if code in DIGIT_CODES)
+                edits = []
+                for i, code in enumerate(seq):
+                    if locked >> i & 1:
+                        continue
+                    shift = BITS * (n - 1 - i)
+                    for other, cost in self.substitutions[code]:
+                        if spent + cost > max_cost + 1e-9:
+                            break
+                        edits.append((value + ((other - code) << shift), spent + cost, i, other, 0))
+                if spent + 1.0 <= max_cost + 1e-9:
+                    for i in range(n):
+                        shift = BITS * (n - 1 - i)
+                        edits.append((((value >> (shift + BITS)) << shift) | (value & ((1 << shift) - 1)),
+                                      spent + 1.0, i, None, -1))
+                    if n < MAX_GLYPHS:
+                        for i in range(n + 1):
+                            shift = BITS * (n - i)
+                            high, low = (value >> shift) << BITS, value & ((1 << shift) - 1)
+                            for other in (DIGIT_CODES if i <= digits else ()) + (LETTER_CODES if i >= digits else ()):
+                                edits.append((((high | other) << shift) | low, spent + 1.0, i, other, 1))
+                for candidate, cost, i, other, kind in edits:
+                    if not candidate:
+                        continue
+                    if cost < best.get(candidate, float('inf')):
+                        best[candidate] = cost
+                    if max_cost - cost < self.min_cost - 1e-9:
+                        continue
+                    low = locked & ((1 << i) - 1)
+                    if kind == 0:
+                        edited, mask = seq[:i] + (other,) + seq[i + 1:], locked | 1 << i
+                    elif kind < 0:
+                        edited, mask = seq[:i] + seq[i + 1:], low | (locked >> (i + 1)) << i
+                    else:
+                        edited, mask = seq[:i] + (other,) + seq[i:], low | 1 << i | (locked >> i) << (i + 1)
+                    # the same plate reached with other positions locked may still lead elsewhere
+                    if cost < expanded.get((candidate, mask), float('inf')):
+                        expanded[candidate, mask] = cost
+                        following.append((edited, mask, cost))
+            frontier = following
+        return best
+
+    def match(self, plate, max_cost=None):
+        # [(plate, cost)] on the list within max_cost of the read, cheapest first;
+        # max_cost=0 is an exact lookup
+        start = time.perf_counter()
+        max_cost = self.max_cost if max_cost is None else max_cost
+        index = self.index
+        codes = parse(plate)
+        matches = []
+        if codes is not None and len(index):
+            if max_cost <= 0:
+                value = encode(codes)
+                i = np.searchsorted(index, value)
+                if i < len(index) and index[i] == value:
+                    matches = [(decode(value), 0.0)]
+            else:
+                candidates = self.neighbours(codes, max_cost)
+                values = np.fromiter(candidates, np.int64, len(candidates))
+                found = np.searchsorted(index, values)
+                found[found == len(index)] = 0
+                hit = index[found] == values
+                costs = list(candidates.values())
+                matches = sorted(((decode(int(v)), costs[i]) for i, v in zip(np.flatnonzero(hit), values[hit])),
+                                 key=lambda m: (m[1], m[0]))
+        with self._lock:
+            self.lookups += 1
+            self.hits += bool(matches)
+            self.lookup_time += time.perf_counter() - start
+        return matches
+
+    def stats(self):
+        with self._lock:
+            return {"plates": len(self.index), "invalid": self.invalid, "reloads": self.reloads,
+                    "lookups": self.lookups, "hits": self.hits,
+                    "lookup_avg_us": 1e6 * self.lookup_time / self.lookups if self.lookups else 0.0}
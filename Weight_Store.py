@@ -0,0 +1,108 @@
+import os
+import sys
+import json
+import time
+import multiprocessing
+import numpy as np
+
+STORE_DIR = "Weight Store"
+ALIGNMENT = 64
+DARKNET_WEIGHTS = "CarPlateModel/yolov3-tiny.backup"
+
+def convert(out_dir=STORE_DIR):
+    # one-time conversion: parse the h5 and darknet files once and lay every
+    # tensor out in a single flat file at aligned offsets
+    from digit_recognizer_ import Number_Recognizer
+    from Character_Recognizer import Character_Recognizer
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = []
+    models = {}
+    for key, recognizer in (("digits", Number_Recognizer()), ("characters", Character_Recognizer())):
+        weights = recognizer.loaded_model.get_weights()
+        models[key] = len(weights)
+        for i, w in enumerate(weights):
+            arrays.append(("%s/%d" % (key, i), np.ascontiguousarray(w)))
+    arrays.append(("detector/weights", np.fromfile(DARKNET_WEIGHTS, dtype=np.uint8)))
+
+    entries = {}
+    offset = 0
+    with open(os.path.join(out_dir, "weights.bin"), "wb") as f:
+        for name, a in arrays:
+            pad = -offset % ALIGNMENT
+            f.write(b"\0" * pad)
+            offset += pad
+            entries[name] = {"offset": offset, "shape": list(a.shape), "dtype": a.dtype.str}
+            f.write(a.tobytes())
+            offset += a.nbytes
+    with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+        json.dump({"alignment": ALIGNMENT, "models": models, "entries": entries}, f, indent=1)
+    return offset
+
+class Weight_Store:
+    def __init__(self, path=STORE_DIR):
+        with open(os.path.join(path, "manifest.json")) as f:
+            self.manifest = json.load(f)
+        # read-only shared mapping: workers read the same page-cache pages instead of
+        # each parsing the files, but set_weights and readNetFromDarknet copy every
+        # tensor into the process, so each worker still holds its own copy
+        self.data = np.memmap(os.path.join(path, "weights.bin"), dtype=np.uint8, mode="r")
+
+    def array(self, name):
+        e = self.manifest["entries"][name]
+        dtype = np.dtype(e["dtype"])
+        count = int(np.prod(e["shape"], dtype=np.int64))
+        return np.frombuffer(self.data, dtype=dtype, count=count, offset=e["offset"]).reshape(e["shape"])
+
+    def model_weights(self, key):
+        return [self.array("%s/%d" % (key, i)) for i in range(self.manifest["models"][key])]
+
+    def load_model(self, model, key):
+        model.set_weights(self.model_weights(key))
+
+    def darknet_weights(self):
+        return self.array("detector/weights")
+
+def rss():
+    # resident set split into private (anonymous) and file-backed pages, in MB
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("VmRSS", "RssAnon", "RssFile", "RssShmem"):
+                status[key] = int(value.split()[0]) / 1024.0
+    return status
+
+def _worker(use_store, results):
+    from digit_recognizer_ import Number_Recognizer
+    from Character_Recognizer import Character_Recognizer
+    from Car_Plate_Detection import Car_Plate_Detection
+    before = rss()
+    start = time.time()
+    store = Weight_Store() if use_store else None
+    models = (Number_Recognizer(weight_store=store), Character_Recognizer(weight_store=store),
+              Car_Plate_Detection(weight_store=store))
+    results.put({"pid": os.getpid(), "store": use_store, "load_s": time.time() - start,
+                 "before": before, "after": rss()})
+
+def report(workers=4):
+    ctx = multiprocessing.get_context("spawn")
+    for use_store in (False, True):
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_worker, args=(use_store, results)) for _ in range(workers)]
+        for p in procs:
+            p.start()
+        for _ in procs:
+            r = results.get()
+            print("%s pid=%d load=%.2fs rss before=%.1fMB after=%.1fMB anon=%.1fMB file=%.1fMB" % (
+                "mmap" if r["store"] else "h5  ", r["pid"], r["load_s"], r["before"].get("VmRSS", 0),
+                r["after"].get("VmRSS", 0), r["after"].get("RssAnon", 0), r["after"].get("RssFile", 0)))
+        for p in procs:
+            p.join()
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == "convert":
+        print("wrote %d bytes to %s" % (convert(), STORE_DIR))
+    elif len(sys.argv) > 1 and sys.argv[1] == "rss":
+        report(int(sys.argv[2]) if len(sys.argv) > 2 else 4)
+    else:
+        print("usage: python Weight_Store.py convert | rss [workers]")
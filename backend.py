@@ -1,58 +1,46 @@
 from flask import Flask, request, jsonify
-from werkzeug.utils import secure_filename
 import os
-import cv2
-import numpy as np
-from Extract_Character import *
-from Character_Recognizer import *
-from digit_recognizer_ import *
-from Car_Plate_Detection import *
+from serving import create_pipeline, create_cache, create_read_store, query_reads, service_stats, allowed_file, \
+    decode_and_process, request_deadline
+from Admission_Control import *
 
 app = Flask(__name__)
-
-# Configure upload folder
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
-
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+# compact bodies even under --debug, byte for byte what the Tornado front-end sends
+app.json.compact = True
 
 # Initialize models
-cr = Character_Recognizer()
-nr = Number_Recognizer()
-Ec = Extract_Characters()
-cp = Car_Plate_Detection()
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def process_image(image):
-    try:
-        PlateImg = cp.Detect_Plate(image)
-        
-        if PlateImg is None or isinstance(PlateImg, bool):
-            return {"success": False, "message": "No plate found in image"}
-
-        numbers, characters = Ec.extract(PlateImg)
-        word = []
-        
-        for i in range(len(numbers)):
-            word.append(nr.ocr(numbers[i]))
-
-        for i in range(len(characters)):
-            word.append(cr.ocr(characters[i]))
-
-        return {"success": True, "plate_number": ','.join(word)}
-    
-    except Exception as e:
-        return {"success": False, "message": f"Error processing image: {str(e)}"}
+pipeline = create_pipeline()
+cache = create_cache()
+admission = Admission_Control()
+read_store = create_read_store()
+
+# PLATE_GRPC_PORT also serves the gRPC API from the same pipeline objects
+if os.environ.get('PLATE_GRPC_PORT'):
+    from grpc_backend import start_grpc_server
+    grpc_server = start_grpc_server(pipeline, int(os.environ['PLATE_GRPC_PORT']), cache=cache)
+
+@app.errorhandler(Overloaded)
+def overloaded(e):
+    response = jsonify(e.body())
+    response.status_code = e.status
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"})
 
+@app.route('/stats', methods=['GET'])
+def stats():
+    return jsonify(service_stats(pipeline, cache, admission))
+
+@app.route('/reads', methods=['GET'])
+def reads():
+    try:
+        return jsonify(query_reads(read_store, request.args.get))
+    except Exception as e:
+        return jsonify({"success": False, "message": f"Error: {str(e)}"})
+
 @app.route('/recognize_plate', methods=['POST'])
 def recognize_plate():
     try:
@@ -65,43 +53,32 @@ def recognize_plate():
             return jsonify({"success": False, "message": "No selected file"})
 
         if file and allowed_file(file.filename):
-            # Save the file temporarily
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-
-            # Read and process the image
-            image = cv2.imread(filepath)
-            
-            # Remove the temporary file
-            os.remove(filepath)
-
-            if image is None:
-                return jsonify({"success": False, "message": "Failed to read image"})
-
-            result = process_image(image)
+            # decoded in memory and looked up in the result cache, as on the Tornado front-end
+            data, camera, deadline = file.read(), request.headers.get('X-Camera-Id'), request_deadline(request.headers)
+            result = admission.call(lambda: decode_and_process(pipeline, data, "Failed to read image",
+                                                               camera, cache, deadline), deadline=deadline)
             return jsonify(result)
 
         return jsonify({"success": False, "message": "Invalid file type"})
 
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Error: {str(e)}"})
 
 @app.route('/recognize_plate_stream', methods=['POST'])
 def recognize_plate_stream():
     try:
-        # Get raw image data from request
-        nparr = np.frombuffer(request.data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-        if image is None:
-            return jsonify({"success": False, "message": "Failed to decode image stream"})
-
-        result = process_image(image)
+        # Raw image data from request; identical bytes share one read through the cache
+        data, camera, deadline = request.data, request.headers.get('X-Camera-Id'), request_deadline(request.headers)
+        result = admission.call(lambda: decode_and_process(pipeline, data, "Failed to decode image stream",
+                                                           camera, cache, deadline), stream=True, deadline=deadline)
         return jsonify(result)
 
+    except Overloaded:
+        raise
     except Exception as e:
         return jsonify({"success": False, "message": f"Error: {str(e)}"})
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,60 @@
+import os
+import sys
+import glob
+import argparse
+import tracemalloc
+import cv2
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Car_Plate_Detection import *
+
+# steady-state allocation of the detector forward pass, traced with tracemalloc
+# after a warm-up call, and parity of the in-place blob with blobFromImages.
+# Exits non-zero when a forward allocates more than --max-bytes on top of the output
+# arrays, which only single-frame forwards can reuse. Run from the repo root:
+#   python benchmarks/bench_allocations.py gate_frames/ --batch 4
+
+def traced(run, repeat):
+    run()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(repeat):
+        run()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak - start, (current - start) / float(repeat)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('frames', nargs='?', help="directory of frames; random frames when omitted")
+    parser.add_argument('--batch', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--max-bytes', type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    if args.frames:
+        paths = sorted(glob.glob(os.path.join(args.frames, '*')))
+        frames = [f for f in (cv2.imread(p) for p in paths) if f is not None][:args.batch]
+    else:
+        frames = [np.random.randint(0, 256, (720, 1280, 3), np.uint8) for _ in range(args.batch)]
+    cp = Car_Plate_Detection()
+
+    reference = cv2.dnn.blobFromImages(frames, 1 / 255, (416, 416), [0, 0, 0], 1, crop=False)
+    exact = np.array_equal(cp.blob(frames, 416), reference)
+    cp.net.setInput(reference)
+    outputs = 0 if len(frames) == 1 else sum(o.nbytes for o in cp.net.forward(cp.getOutputsNames(cp.net)))
+
+    def allocating():
+        cp.net.setInput(cv2.dnn.blobFromImages(frames, 1 / 255, (416, 416), [0, 0, 0], 1, crop=False))
+        cp.net.forward(cp.getOutputsNames(cp.net))
+
+    before, _ = traced(allocating, args.repeat)
+    after, leaked = traced(lambda: cp.forward(frames), args.repeat)
+    print("blob parity: %s" % ("exact" if exact else "MISMATCH"))
+    print("peak bytes per forward: blobFromImages %d, reused buffers %d (%.1f retained per call)"
+          % (before, after, leaked))
+    sys.exit(0 if exact and after <= args.max_bytes + outputs else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import random
+import argparse
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Plate_Consensus import *
+
+# simulated vehicles crossing a camera: every frame's plate box drifts a little and
+# its OCR read gets each glyph wrong with --error probability (low confidence when
+# wrong). Reports how many frames skip OCR, how often the consensus plate is wrong,
+# and the OCR time saved per vehicle at --ocr-ms per plate.
+#   python benchmarks/bench_consensus.py --vehicles 2000 --frames 40 --reads 3
+GLYPHS = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+LETTERS = ['alf', 'beh', 'teh', 'gem', 'dal', 'reh', 'sen', 'sad', 'tah', 'een', 'feh', 'lam', 'mem', 'noon']
+
+def noisy_read(rng, plate, error):
+    glyphs, confidences = [], []
+    for glyph in plate:
+        if rng.random() < error:
+            glyphs.append(rng.choice(GLYPHS if glyph in GLYPHS else LETTERS))
+            confidences.append(rng.uniform(0.3, 0.7))
+        else:
+            glyphs.append(glyph)
+            confidences.append(rng.uniform(0.85, 1.0))
+    return ','.join(glyphs), confidences
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vehicles', type=int, default=2000)
+    parser.add_argument('--frames', type=int, default=40)
+    parser.add_argument('--reads', type=int, default=3)
+    parser.add_argument('--share', type=float, default=CONSENSUS_SHARE)
+    parser.add_argument('--error', type=float, default=0.05)
+    parser.add_argument('--ocr-ms', type=float, default=25.0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    consensus = Plate_Consensus(args.reads, args.share)
+    now, wrong, consensus_reads = 1e9, 0, 0
+    for vehicle in range(args.vehicles):
+        plate = [rng.choice(GLYPHS) for _ in range(4)] + [rng.choice(LETTERS) for _ in range(3)]
+        x = rng.randrange(0, 800)
+        now += 2 * CONSENSUS_GAP
+        for frame in range(args.frames):
+            now += 0.1
+            box = (x + 3 * frame, 400 - 2 * frame, 120, 40)
+            read = consensus.skip('gate', box, now)
+            if read is not None:
+                consensus_reads += 1
+                wrong += read['plate_number'] != ','.join(plate)
+                continue
+            consensus.cost(args.ocr_ms / 1000.0)
+            word, confidences = noisy_read(rng, plate, args.error)
+            consensus.vote('gate', box, word, confidences, now)
+    stats = consensus.stats()
+    print("frames: %d read, %d skipped (%.0f%%), %d restarts" % (stats['ocr_frames'], stats['skipped_frames'],
+                                                               100 * stats['skip_rate'], stats['restarts']))
+    print("consensus reads wrong: %d of %d" % (wrong, consensus_reads))
+    print("saved: %.0f ms of OCR per vehicle (%d tracks for %d vehicles)" % (stats['saved_ms_per_vehicle'],
+                                                                           stats['tracks'], args.vehicles))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Read_Dedup import *
+
+# simulated gate traffic: every vehicle is read --burst times in a row by one camera
+# over a few seconds. Reports the cost of observe(), how many reads collapse into
+# events, and that the open events (and memory) stay bounded over a long run.
+#   python benchmarks/bench_dedup.py --vehicles 200000 --cameras 16
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--vehicles', type=int, default=200000)
+    parser.add_argument('--cameras', type=int, default=16)
+    parser.add_argument('--burst', type=int, default=20)
+    parser.add_argument('--window', type=float, default=30.0)
+    parser.add_argument('--max-events', type=int, default=DEDUP_MAX_EVENTS)
+    parser.add_argument('--trace', action='store_true', help="measure peak memory (slows observe down)")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    closed = []
+    dedup = Read_Dedup(args.window, args.max_events, on_close=lambda event: closed.append(event["hits"]))
+    if args.trace:
+        tracemalloc.start()
+    now, reads, peak_open, elapsed = 1e9, 0, 0, 0.0
+    for vehicle in range(args.vehicles):
+        camera = 'cam%d' % rng.randrange(args.cameras)
+        plate = '%d,%d,%d,alf,beh' % (rng.randrange(10), rng.randrange(10), vehicle % 1000)
+        for _ in range(args.burst):
+            now += 0.2 / args.cameras
+            start = time.perf_counter()
+            dedup.observe(camera, plate, now)
+            elapsed += time.perf_counter() - start
+            reads += 1
+        peak_open = max(peak_open, dedup.size)
+    peak_bytes = tracemalloc.get_traced_memory()[1] if args.trace else 0
+    stats = dedup.stats()
+    print("observe: %.1f us/read over %d reads" % (1e6 * elapsed / reads, reads))
+    print("events: %d (%.1f%% of reads collapsed), %d closed, %.1f hits per closed event" % (
+        stats['events'], 100 * stats['collapse_rate'], len(closed), sum(closed) / max(len(closed), 1)))
+    print("open events: peak %d, cap %d, evicted %d" % (peak_open, args.max_events, stats['evicted']))
+    if args.trace:
+        print("traced memory peak %.1f MB" % (peak_bytes / 1e6))
+    print("bloom: %d plates in %.1f MB, false positive rate %.4f" % (
+        stats['bloom_plates'], stats['bloom_bytes'] / 1e6, stats['bloom_false_positive']))
+
+if __name__ == '__main__':
+    main()
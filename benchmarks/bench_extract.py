@@ -0,0 +1,67 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Extract_Character import *
+
+# single-pass extract() against the per-half extractCharacters() reference on
+# synthetic plates with glyph-sized blobs and heavy speckle noise
+#   python benchmarks/bench_extract.py [plates] [noise]
+
+def synthetic_plate(rng, noise):
+    plate = np.full((150, 200, 3), 230, np.uint8)
+    for x in range(8, 190, 28):
+        w, h = rng.randint(12, 26), rng.randint(18, 70)
+        y = rng.randint(12, 150 - h - 12)
+        cv2.rectangle(plate, (x, y), (x + w, y + h), (20, 20, 20), -1)
+        cv2.circle(plate, (x + w // 2, y + h // 2), max(w // 4, 2), (230, 230, 230), -1)
+    # dark speckle becomes hundreds of tiny components after thresholding
+    speckle = rng.rand(150, 200) < noise
+    plate[speckle] = rng.randint(0, 80, (speckle.sum(), 1))
+    return plate
+
+def reference(Ec, img):
+    resized_img = cv2.resize(img, (200, 150))
+    numbers = Ec.extractCharacters(resized_img[:, 0:100])
+    characters = Ec.extractCharacters(resized_img[:, 100:])
+    return [x[0] for x in numbers], [x[0] for x in characters]
+
+def outcome(fn, img):
+    # both paths must also fail alike, e.g. on the empty crops of blobs near the top edge
+    try:
+        return fn(img)
+    except cv2.error:
+        return None
+
+def same(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    return all(len(x) == len(y) and all(np.array_equal(p, q) for p, q in zip(x, y)) for x, y in zip(a, b))
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    noise = float(sys.argv[2]) if len(sys.argv) > 2 else 0.08
+    rng = np.random.RandomState(0)
+    plates = [synthetic_plate(rng, noise) for _ in range(n)]
+    Ec = Extract_Characters()
+
+    components = np.mean([cv2.connectedComponents(~cv2.threshold(cv2.cvtColor(p, cv2.COLOR_RGB2GRAY), 0, 255,
+                          cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1], connectivity=4)[0] for p in plates])
+    results = [(outcome(lambda p: reference(Ec, p), p), outcome(Ec.extract, p)) for p in plates]
+    mismatches = sum(not same(a, b) for a, b in results)
+    plates = [p for p, (a, _) in zip(plates, results) if a is not None]
+
+    for name, fn in (("per-half loop", lambda p: reference(Ec, p)), ("single pass", Ec.extract)):
+        start = time.perf_counter()
+        for p in plates:
+            fn(p)
+        elapsed = time.perf_counter() - start
+        print("%-14s %8.1f us/plate" % (name, 1e6 * elapsed / len(plates)))
+    print("%d plates (%d timed), %.0f components per plate on average, %d mismatches" % (
+        n, len(plates), components, mismatches))
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+import os
+import sys
+import time
+import glob
+import argparse
+import cv2
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Car_Plate_Detection import *
+
+# time saved and detection agreement when only one yolo head is computed,
+# against both heads, on a directory of camera frames. Run from the repo root:
+#   python benchmarks/bench_heads.py gate_frames/ --repeat 5
+
+def select(cp, frame, heads):
+    cp.active_heads = heads
+    outs = cp.forward([frame])[0]
+    boxes, confidences = cp.collectBoxes(outs, 0, 0, frame.shape[1], frame.shape[0], 0.5)
+    return cp.selectBox(boxes, confidences, 0.5, 0.5)[1]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('frames', help="directory of frames")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(args.frames, '*'))
+                   if p.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+    frames = [f for f in (cv2.imread(p) for p in paths) if f is not None]
+    cp = Car_Plate_Detection()
+    select(cp, frames[0], "both")
+
+    reference = [select(cp, f, "both") for f in frames]
+    print("%-6s %10s %10s" % ("heads", "ms/frame", "agreement"))
+    for heads in ("both", "coarse", "fine"):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for f in frames:
+                cp.active_heads = heads
+                cp.forward([f])
+        ms = 1000.0 * (time.perf_counter() - start) / (args.repeat * len(frames))
+        boxes = [select(cp, f, heads) for f in frames]
+        agree = sum((a is None and b is None) or (a is not None and b is not None and iou(a, b) >= 0.5)
+                    for a, b in zip(reference, boxes))
+        print("%-6s %10.2f %9.1f%%" % (heads, ms, 100.0 * agree / len(frames)))
+
+if __name__ == '__main__':
+    main()
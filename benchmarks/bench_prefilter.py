@@ -0,0 +1,95 @@
+import os
+import sys
+import csv
+import argparse
+import cv2
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Plate_Prefilter import *
+
+# recall of the pre-YOLO prefilter on a labelled set; labels.csv has rows of
+# path,has_plate (1/0). Exits non-zero when recall falls under --min-recall.
+#   python benchmarks/bench_prefilter.py labels.csv --min-recall 0.99
+# --synthetic instead draws plates (60-400 px wide) into 640-1920 px street-like
+# scenes (sky and road gradients, car bodies, windows, lane markings, sensor noise),
+# plus as many scenes without one; a smoke test, not a substitute for camera footage
+WIDTHS = (640, 1280, 1920)
+PLATE_WIDTHS = (60, 80, 120, 200, 400)
+
+def background(rng, w, h):
+    horizon = int(h * rng.uniform(0.3, 0.5))
+    column = np.empty((h, 1, 3), np.float32)
+    column[:horizon] = np.linspace(200, 150, horizon)[:, None, None]
+    column[horizon:] = np.linspace(90, 60, h - horizon)[:, None, None]
+    frame = np.repeat(column, w, axis=1)
+    for _ in range(int(rng.integers(2, 6))):
+        # car bodies with darker windows
+        cw, ch = int(w * rng.uniform(0.1, 0.3)), int(h * rng.uniform(0.1, 0.25))
+        x, y = int(rng.integers(0, w - cw)), int(rng.integers(horizon // 2, h - ch))
+        cv2.rectangle(frame, (x, y), (x + cw, y + ch), [float(c) for c in rng.uniform(30, 220, 3)], -1)
+        cv2.rectangle(frame, (x + cw // 8, y + ch // 10), (x + cw * 7 // 8, y + ch * 4 // 10),
+                      (40, 45, 50), -1)
+    for _ in range(int(rng.integers(0, 3))):
+        # foliage or facade texture
+        tw, th = int(w * rng.uniform(0.1, 0.3)), int(h * rng.uniform(0.1, 0.3))
+        x, y = int(rng.integers(0, w - tw)), int(rng.integers(0, h // 2))
+        patch = cv2.GaussianBlur(rng.uniform(20, 220, (th, tw)), (3, 3), 0)[:, :, None]
+        frame[y:y + th, x:x + tw] = patch * rng.uniform(0.6, 1.2, 3)
+    for x in range(int(rng.integers(0, w // 8)), w, w // 6):
+        cv2.line(frame, (x, h * 9 // 10), (x + w // 12, h * 9 // 10), (230, 230, 230), max(h // 200, 1))
+    frame = cv2.GaussianBlur(frame, (5, 5), 0) + rng.normal(0, 3, frame.shape)
+    return np.clip(frame, 0, 255).astype(np.uint8)
+
+def synthetic(seed=0):
+    rng = np.random.default_rng(seed)
+    for w in WIDTHS:
+        h = w * 9 // 16
+        for pw in PLATE_WIDTHS:
+            if pw >= w // 2:
+                continue
+            frame = background(rng, w, h)
+            ph = max(int(pw * 0.3), 8)
+            plate = np.full((ph, pw, 3), 235, np.uint8)
+            cv2.rectangle(plate, (0, 0), (pw - 1, ph - 1), (20, 20, 20), max(pw // 60, 1))
+            cv2.putText(plate, "1234 ABC", (int(pw * 0.05), int(ph * 0.75)), cv2.FONT_HERSHEY_SIMPLEX, pw / 260.0,
+                        (10, 10, 10), max(pw // 50, 1))
+            # the plate sits low on the rear of its own car
+            cw, ch = min(int(pw * 3), w - 2), min(int(pw * 1.4), h - 2)
+            cx, cy = int(rng.integers(0, w - cw)), int(rng.integers(0, h - ch))
+            cv2.rectangle(frame, (cx, cy), (cx + cw, cy + ch), [int(c) for c in rng.integers(30, 220, 3)], -1)
+            x, y = cx + (cw - pw) // 2, cy + ch - ph - ch // 8
+            frame[y:y + ph, x:x + pw] = plate
+            yield frame, True
+            yield background(rng, w, h), False
+
+def load(labels):
+    base = os.path.dirname(os.path.abspath(labels))
+    with open(labels) as f:
+        for row in csv.reader(f):
+            if not row or row[0].startswith('#') or row[0] == 'path':
+                continue
+            frame = cv2.imread(os.path.join(base, row[0]))
+            if frame is None:
+                print("skipping unreadable %s" % row[0], file=sys.stderr)
+                continue
+            yield frame, row[1].strip() == '1'
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('labels', nargs='?')
+    parser.add_argument('--synthetic', action='store_true')
+    parser.add_argument('--min-recall', type=float, default=0.99)
+    parser.add_argument('--width', type=int, default=416)
+    parser.add_argument('--min-edge-density', type=float, default=None)
+    args = parser.parse_args()
+    if not args.synthetic and args.labels is None:
+        parser.error("give labels.csv or --synthetic")
+
+    labelled = list(synthetic()) if args.synthetic else list(load(args.labels))
+    result = measure(Plate_Prefilter(width=args.width, min_edge_density=args.min_edge_density), labelled)
+    print("frames=%d recall=%.4f empty frames skipped=%.1f%% %.2f ms/frame" % (
+        result["frames"], result["recall"], 100 * result["empty_skip_rate"], result["avg_ms"]))
+    sys.exit(0 if result["recall"] >= args.min_recall else 1)
+
+if __name__ == '__main__':
+    main()
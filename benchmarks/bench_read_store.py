@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Read_Store import *
+
+# cost of record() on the request path and the sustained insert rate of the
+# background writer (including the partial-plate index), then the latency of
+# plate, camera and partial-plate queries. Reads are spread over the last
+# --hours, and --verify random partial-plate queries with time and camera filters
+# are checked against a brute-force scan of the recorded reads.
+#   python benchmarks/bench_read_store.py --reads 100000 --plates 20000
+LETTERS = ['alf', 'beh', 'teh', 'gem', 'dal', 'reh', 'sen', 'sad', 'tah', 'een', 'feh', 'qaaf', 'lam', 'mem',
+           'noon', 'heeh', 'waw', 'yeh']
+
+def random_plate(rng):
+    return ','.join([str(rng.randrange(10)) for _ in range(rng.randint(3, 4))] +
+                    [rng.choice(LETTERS) for _ in range(rng.randint(2, 3))])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reads', type=int, default=100000)
+    parser.add_argument('--cameras', type=int, default=16)
+    parser.add_argument('--plates', type=int, default=20000)
+    parser.add_argument('--hours', type=float, default=6.0)
+    parser.add_argument('--verify', type=int, default=200)
+    parser.add_argument('--path', default=os.path.join(tempfile.mkdtemp(), 'reads.db'))
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    plates = [random_plate(rng) for _ in range(args.plates)]
+    now = time.time()
+    reads = [('cam%d' % (k % args.cameras), rng.choice(plates), now - rng.uniform(0, args.hours * 3600))
+             for k in range(args.reads)]
+    store = Read_Store(args.path, max_queue=args.reads)
+    start = time.perf_counter()
+    for camera, plate, ts in reads:
+        store.record(camera, plate, [0.99, 0.98, 0.97, 0.9], (10, 20, 120, 40), ts)
+    enqueued = time.perf_counter() - start
+    while store.stats()['written'] < args.reads - store.stats()['dropped']:
+        time.sleep(0.01)
+    total = time.perf_counter() - start
+    stats = store.stats()
+    print("record: %.1f us/read on the request path" % (1e6 * enqueued / args.reads))
+    print("writer: %.0f reads/s in batches of %.0f, %d dropped" % (stats['written'] / total, stats['avg_batch'],
+                                                                   stats['dropped']))
+    known = plates[0].split(',')
+    partial = ','.join(known[:1] + ['?'] + known[2:-1] + ['*'])
+    queries = (("plate", dict(plate=plates[0])), ("camera", dict(camera='cam3', limit=100)),
+               ("pattern %s" % partial, dict(plate=partial)),
+               ("pattern %s" % ','.join(['*'] + known[-2:]), dict(plate=','.join(['*'] + known[-2:]))),
+               ("pattern %s on cam3" % ','.join(known[:2] + ['*']), dict(plate=','.join(known[:2] + ['*']),
+                                                                         camera='cam3')))
+    for label, query in queries if store.index else queries[:2]:
+        start = time.perf_counter()
+        found = store.query(**query)
+        print("query by %s: %d reads in %.2f ms" % (label, len(found), 1000 * (time.perf_counter() - start)))
+
+    if store.index and args.verify:
+        wrong = 0
+        for _ in range(args.verify):
+            glyphs = rng.choice(plates).split(',')
+            pattern = ','.join(g if rng.random() < 0.6 else rng.choice('?*') for g in glyphs)
+            since = now - rng.uniform(0, args.hours * 3600)
+            until = rng.choice([None, since + rng.uniform(60, 3600)])
+            camera = rng.choice([None, 'cam%d' % rng.randrange(args.cameras)])
+            regex = pattern_regex(pattern)
+            expected = sorted(ts for cam, plate, ts in reads if regex.fullmatch(plate + ',') and ts >= since and
+                              (until is None or ts <= until) and camera in (None, cam))
+            found = sorted(r['ts'] for r in store.query(plate=pattern, camera=camera, since=since, until=until,
+                                                        limit=args.reads))
+            if found != expected:
+                wrong += 1
+                print("MISMATCH %s since=%.0f until=%s camera=%s: %d reads, expected %d" % (
+                    pattern, since, until, camera, len(found), len(expected)))
+        print("verify: %d of %d filtered pattern queries match a brute-force scan" % (args.verify - wrong, args.verify))
+        if wrong:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+import numpy as np
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Frame_Ring import *
+
+# frames per second a capture process can hand to an inference process: pickled
+# through a pipe against written into the shared-memory ring and read in place.
+# The ring never blocks the writer, so frames a reader misses count as dropped.
+#   python benchmarks/bench_ring.py --frames 300 --width 1920 --height 1080
+
+def pipe_reader(conn, count):
+    for _ in range(count):
+        frame = conn.recv()
+        frame[0, 0].sum()
+
+def ring_reader(name, count, done):
+    ring = Frame_Ring(name, create=False)
+    for seq, frame in ring.frames(drop_stale=False):
+        frame[0, 0].sum()
+        if seq == count - 1:
+            break
+    del frame
+    done.put(ring.stats())
+    ring.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--slots', type=int, default=8)
+    args = parser.parse_args()
+    frame = np.random.randint(0, 256, (args.height, args.width, 3), np.uint8)
+
+    receive, send = multiprocessing.Pipe(duplex=False)
+    reader = multiprocessing.Process(target=pipe_reader, args=(receive, args.frames))
+    reader.start()
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        send.send(frame)
+    reader.join()
+    pipe_fps = args.frames / (time.perf_counter() - start)
+
+    ring = Frame_Ring(slots=args.slots, slot_bytes=frame.nbytes)
+    done = multiprocessing.Queue()
+    reader = multiprocessing.Process(target=ring_reader, args=(ring.name, args.frames, done))
+    reader.start()
+    start = time.perf_counter()
+    for _ in range(args.frames):
+        ring.write(frame)
+    stats = done.get()
+    reader.join()
+    ring_fps = args.frames / (time.perf_counter() - start)
+    ring.close()
+
+    print("%d x %d frames (%.1f MB): pipe %.0f fps, ring %.0f fps (dropped %d, torn %d)"
+          % (args.width, args.height, frame.nbytes / 1e6, pipe_fps, ring_fps, stats["dropped"], stats["torn"]))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import os
+import sys
+import time
+import argparse
+import cv2
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Car_Plate_Detection import *
+from bench_prefilter import load
+
+# latency cost against recall gain of tiled detection, per frame width; uses
+# the same path,has_plate label file as bench_prefilter.py. Run from the repo root:
+#   python benchmarks/bench_tiled.py labels.csv --widths 1280 1920 2560 3840
+
+def run(detect, frames):
+    found = 0
+    start = time.perf_counter()
+    for frame in frames:
+        found += not isinstance(detect(frame), bool)
+    return 1000.0 * (time.perf_counter() - start) / len(frames), found / float(len(frames))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('labels')
+    parser.add_argument('--widths', type=int, nargs='+', default=[1280, 1920, 2560, 3840])
+    parser.add_argument('--tile-size', type=int, default=832)
+    args = parser.parse_args()
+
+    plates = [frame for frame, has_plate in load(args.labels) if has_plate]
+    cp = Car_Plate_Detection(tile_size=args.tile_size)
+    cp.forward(plates[:1])
+    print("%6s %12s %12s %12s %12s" % ("width", "plain ms", "tiled ms", "plain recall", "tiled recall"))
+    for width in args.widths:
+        frames = [cv2.resize(f, (width, int(f.shape[0] * width / float(f.shape[1])))) for f in plates]
+        plain_ms, plain_recall = run(lambda f: cp.checkPlate(*cp.postprocess(f, cp.forward([f])[0], 0.5, 0.5)),
+                                     frames)
+        tiled_ms, tiled_recall = run(cp.Detect_Plate, frames)
+        print("%6d %12.1f %12.1f %12.3f %12.3f" % (width, plain_ms, tiled_ms, plain_recall, tiled_recall))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+import glob
+import argparse
+import cv2
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Car_Plate_Detection import *
+
+# cost of the two-pass detector against a single 416 pass, with the coarse pass on
+# its own net and alternating input sizes on one net. "candidate" times a coarse
+# pass plus a refine pass on a window around the frame centre, i.e. what every frame
+# with a plate candidate costs. On Test/ at --coarse-size 224 (ms/frame): 416 only
+# 98; no candidate 36 either way; candidate 133 with two nets, 179 on one net. The
+# coarse net adds about 100 MB per detector. Two-pass pays off while fewer than
+# about 60% of the frames have a candidate. Run from the repo root:
+#   python benchmarks/bench_two_pass.py gate_frames/ --coarse-size 224
+
+def timed(run, frames, repeat):
+    for f in frames:
+        run(f)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for f in frames:
+            run(f)
+    return 1000.0 * (time.perf_counter() - start) / (repeat * len(frames))
+
+def candidate(cp):
+    def run(frame):
+        h, w = frame.shape[:2]
+        cp.forward([frame], cp.coarse_size)
+        x, y, ww, wh = cp.refineWindow((w * 3 // 8, h * 7 // 16, w // 4, h // 8), w, h)
+        cp.forward([frame[y:y + wh, x:x + ww]])
+    return run
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('frames', help="directory of frames")
+    parser.add_argument('--coarse-size', type=int, default=224)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in glob.glob(os.path.join(args.frames, '*'))
+                   if p.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp')))
+    frames = [f for f in (cv2.imread(p) for p in paths) if f is not None]
+    single = Car_Plate_Detection()
+    two_nets = Car_Plate_Detection(coarse_size=args.coarse_size)
+    one_net = Car_Plate_Detection(coarse_size=args.coarse_size)
+    one_net.coarse_net = None
+
+    print("%-22s %10s" % ("", "ms/frame"))
+    print("%-22s %10.2f" % ("416 only", timed(lambda f: single.forward([f]), frames, args.repeat)))
+    for name, cp in (("two nets", two_nets), ("one net", one_net)):
+        print("%-22s %10.2f" % (name + ", no candidate",
+                                timed(lambda f: cp.forward([f], cp.coarse_size), frames, args.repeat)))
+        print("%-22s %10.2f" % (name + ", candidate", timed(candidate(cp), frames, args.repeat)))
+        print("%-22s %10.2f" % (name + ", Detect_Plates", timed(lambda f: cp.Detect_Plates([f]), frames, args.repeat)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Watchlist import *
+
+# load time and index size of a random watchlist, then exact and fuzzy lookup
+# latency for reads that are on the list, one confusable glyph off, and absent.
+#   python benchmarks/bench_watchlist.py --plates 1000000
+# --verify N also checks N fuzzy reads against a brute-force weighted Levenshtein
+# over a small list and exits non-zero on any mismatch
+
+def random_plate(rng):
+    return ','.join([rng.choice(DIGITS) for _ in range(rng.randint(1, 4))] +
+                    [rng.choice(LETTERS) for _ in range(rng.randint(1, 3))])
+
+def distance(a, b, costs):
+    # weighted Levenshtein; a digit is never replaced by a letter or the other way round
+    row = [float(j) for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        previous, row = row, [float(i)] + [0.0] * len(b)
+        for j in range(1, len(b) + 1):
+            if a[i - 1] == b[j - 1]:
+                substitution = 0.0
+            elif (a[i - 1] in DIGIT_CODES) == (b[j - 1] in DIGIT_CODES):
+                substitution = costs.get((a[i - 1], b[j - 1]), 1.0)
+            else:
+                substitution = float('inf')
+            row[j] = min(previous[j] + 1.0, row[j - 1] + 1.0, previous[j - 1] + substitution)
+    return row[-1]
+
+def verify(rng, listed, max_cost):
+    # reads are listed plates with glyphs swapped for confusable ones, so chains of
+    # substitutions get exercised; the list is small so brute force stays cheap
+    confusable = sorted(set(g for pair in CONFUSABLE for g in pair))
+    reads = [','.join(rng.choice([c for c in confusable if c.isdigit() == g.isdigit()]) if rng.random() < 0.5 else g
+                      for g in p.split(',')) for p in listed]
+    plates = sorted(set(random_plate(rng) for _ in range(500)) | set(listed))
+    path = os.path.join(tempfile.mkdtemp(), 'verify.txt')
+    with open(path, 'w') as f:
+        f.write('\n'.join(plates) + '\n')
+    watchlist = Watchlist(path, max_cost)
+    bad = 0
+    for read in reads:
+        codes = parse(read)
+        expected = sorted(((p, round(d, 6)) for p, d in ((p, distance(codes, parse(p), watchlist.costs))
+                                                          for p in plates) if d <= max_cost + 1e-9),
+                          key=lambda m: (m[1], m[0]))
+        got = [(p, round(c, 6)) for p, c in watchlist.match(read)]
+        if got != expected:
+            bad += 1
+            print("mismatch %s: got %s expected %s" % (read, got, expected))
+    print("verify: %d/%d reads match brute force" % (len(reads) - bad, len(reads)))
+    return bad == 0
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--plates', type=int, default=1000000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    parser.add_argument('--max-cost', type=float, default=WATCHLIST_MAX_COST)
+    parser.add_argument('--verify', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    plates = [random_plate(rng) for _ in range(args.plates)]
+    path = os.path.join(tempfile.mkdtemp(), 'watchlist.txt')
+    with open(path, 'w') as f:
+        f.write('\n'.join(plates) + '\n')
+
+    start = time.perf_counter()
+    watchlist = Watchlist(path, args.max_cost)
+    print("load: %d plates in %.2f s, index %.1f MB" % (len(watchlist), time.perf_counter() - start,
+                                                         watchlist.index.nbytes / 1e6))
+
+    swaps = {}
+    for a, b in CONFUSABLE:
+        swaps.setdefault(a, b)
+        swaps.setdefault(b, a)
+    listed = [rng.choice(plates) for _ in range(args.lookups)]
+    confused = [','.join(swaps.get(g, g) for g in p.split(',')) for p in listed]
+    absent = [random_plate(rng) for _ in range(args.lookups)]
+    for name, reads, max_cost in (("exact", listed, 0), ("listed", listed, None), ("confused", confused, None),
+                                  ("absent", absent, None)):
+        start = time.perf_counter()
+        hits = sum(bool(watchlist.match(read, max_cost)) for read in reads)
+        print("%-8s %7.1f us/lookup, %d/%d hit" % (name, 1e6 * (time.perf_counter() - start) / len(reads),
+                                                  hits, len(reads)))
+    if args.verify:
+        sys.exit(0 if verify(rng, listed[:args.verify], args.max_cost) else 1)
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,23 @@
 import cv2
 import numpy as np 
 from keras.models import model_from_json
+from Compiled_Inference import *
+from Plate_Glyphs import *
 
 class Number_Recognizer:
-    def __init__(self):
-        self.arabic_digit = ['0', '1', '2', '3', '4', '5', '6', '7', '8', '9']
+    arabic_digit = DIGITS
+
+    def __init__(self, weight_store=None):
         json_file = open("Characters Model/digits model json.json", 'r')
         loaded_model_json = json_file.read()
         json_file.close()
         self.loaded_model = model_from_json(loaded_model_json)
-        self.loaded_model.load_weights("Characters Model/digits weights.h5")
+        if weight_store is not None:
+            weight_store.load_model(self.loaded_model, "digits")
+        else:
+            self.loaded_model.load_weights("Characters Model/digits weights.h5")
+        self.infer = Compiled_Inference(self.loaded_model, (28, 28, 1))
+        self.second_pass = Second_Pass()
 
     def get_sides(self, length):
         if length % 2 == 0:
@@ -40,9 +48,17 @@ class Number_Recognizer:
         character = np.expand_dims(character , axis = 2)
         return character
 
+    def predict_batch(self, imgs):
+        batch = np.array([self.preprocess(img) for img in imgs], np.float32)
+        return self.infer(batch)
+
+    def ocr_top_k(self, imgs, k=3):
+        pred = self.second_pass.refine(self.predict_batch, imgs, self.predict_batch(imgs))
+        return top_k(pred, self.arabic_digit, k)
+
+    def ocr_batch(self, imgs):
+        return [best[0][0] for best in self.ocr_top_k(imgs, 1)]
+
     def ocr(self, img):
-        img  = self.preprocess(img)
-        img = img.reshape(-1,28, 28, 1)
-        pred = self.loaded_model.predict(img)
-        return self.arabic_digit[np.argmax(pred)]
+        return self.ocr_batch([img])[0]
 
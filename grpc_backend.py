@@ -0,0 +1,132 @@
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from concurrent import futures
+import grpc
+from serving import *
+
+# Service plate.PlateRecognizer, without generated stubs:
+#   Recognize(bytes) -> bytes                  one encoded frame in, one JSON read out
+#   RecognizeStream(stream bytes) -> stream bytes
+# Reads are the same JSON objects the HTTP API returns; stream reads also carry
+# "frame", the 0-based index of the request frame, since they may arrive out of order.
+SERVICE_NAME = "plate.PlateRecognizer"
+GRPC_WORKERS = int(os.environ.get("PLATE_GRPC_WORKERS", os.cpu_count() or 4))
+GRPC_MAX_IN_FLIGHT = int(os.environ.get("PLATE_GRPC_MAX_IN_FLIGHT", 4))
+MAX_MESSAGE_BYTES = 64 * 1024 * 1024
+
+def _identity(data):
+    return data
+
+def camera_id(context):
+    # cameras identify themselves with x-camera-id call metadata
+    return dict(context.invocation_metadata()).get("x-camera-id")
+
+def call_deadline(context):
+    # the client's own gRPC deadline, as an absolute time.time()
+    remaining = context.time_remaining()
+    return time.time() + remaining if remaining is not None else None
+
+def _encode(result):
+    return json.dumps(result, separators=(",", ":"), sort_keys=True).encode()
+
+class Plate_Recognition_Service:
+    def __init__(self, pipeline, workers=GRPC_WORKERS, max_in_flight=GRPC_MAX_IN_FLIGHT, cache=None):
+        self.pipeline = pipeline
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.executor = futures.ThreadPoolExecutor(max_workers=workers)
+
+    def recognize(self, data, camera=None, deadline=None):
+        try:
+            return decode_and_process(self.pipeline, data, "Failed to decode image stream", camera, self.cache, deadline)
+        except Exception as e:
+            return {"success": False, "message": f"Error: {str(e)}"}
+
+    def Recognize(self, request, context):
+        return _encode(self.recognize(request, camera_id(context), call_deadline(context)))
+
+    def RecognizeStream(self, request_iterator, context):
+        camera, deadline = camera_id(context), call_deadline(context)
+        results = queue.Queue()
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+
+        def done(seq, future):
+            in_flight.release()
+            results.put((seq, future.result()))
+
+        def pump():
+            # reads frames off the stream while earlier ones are still being recognized
+            submitted = 0
+            try:
+                for frame in request_iterator:
+                    in_flight.acquire()
+                    future = self.executor.submit(self.recognize, frame, camera, deadline)
+                    future.add_done_callback(lambda f, seq=submitted: done(seq, f))
+                    submitted += 1
+            except Exception as e:
+                logging.info(f"Recognition stream closed: {str(e)}")
+            finally:
+                results.put(submitted)
+
+        threading.Thread(target=pump, daemon=True).start()
+        sent, total = 0, None
+        while total is None or sent < total:
+            item = results.get()
+            if isinstance(item, int):
+                total = item
+                continue
+            seq, result = item
+            yield _encode(dict(result, frame=seq))
+            sent += 1
+
+    def handler(self):
+        return grpc.method_handlers_generic_handler(SERVICE_NAME, {
+            "Recognize": grpc.unary_unary_rpc_method_handler(
+                self.Recognize, request_deserializer=_identity, response_serializer=_identity),
+            "RecognizeStream": grpc.stream_stream_rpc_method_handler(
+                self.RecognizeStream, request_deserializer=_identity, response_serializer=_identity),
+        })
+
+def start_grpc_server(pipeline, port, workers=GRPC_WORKERS, max_in_flight=GRPC_MAX_IN_FLIGHT, cache=None):
+    service = Plate_Recognition_Service(pipeline, workers, max_in_flight, cache)
+    # every open stream holds one server thread while it is being read
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=workers * 4), options=[
+        ("grpc.max_receive_message_length", MAX_MESSAGE_BYTES),
+        ("grpc.max_send_message_length", MAX_MESSAGE_BYTES),
+    ])
+    server.add_generic_rpc_handlers((service.handler(),))
+    server.add_insecure_port(f"[::]:{port}")
+    server.start()
+    return server
+
+def _metadata(camera):
+    return (("x-camera-id", camera),) if camera else None
+
+def recognize_stream(channel, frames, camera=None, timeout=None):
+    # client side: frames is an iterable of encoded images, yields JSON reads
+    call = channel.stream_stream(f"/{SERVICE_NAME}/RecognizeStream",
+                                 request_serializer=_identity, response_deserializer=json.loads)
+    return call(iter(frames), metadata=_metadata(camera), timeout=timeout)
+
+def recognize(channel, frame, camera=None, timeout=None):
+    call = channel.unary_unary(f"/{SERVICE_NAME}/Recognize",
+                               request_serializer=_identity, response_deserializer=json.loads)
+    return call(frame, metadata=_metadata(camera), timeout=timeout)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="gRPC plate recognition server")
+    parser.add_argument("--port", type=int, default=50051)
+    parser.add_argument("--workers", type=int, default=GRPC_WORKERS)
+    parser.add_argument("--max-in-flight", type=int, default=GRPC_MAX_IN_FLIGHT,
+                        help="frames of one stream recognized concurrently")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = start_grpc_server(create_pipeline(), args.port, args.workers, args.max_in_flight,
+                               create_cache())
+    logging.info(f"gRPC plate recognition server started on port {args.port}")
+    server.wait_for_termination()
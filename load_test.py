@@ -0,0 +1,56 @@
+import sys
+import time
+import argparse
+import asyncio
+import numpy as np
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+
+# compare the Flask and Tornado front-ends, e.g.
+#   python load_test.py --url http://localhost:5000/recognize_plate_stream --concurrency 256
+# every request carries a counter after the image data (decoders ignore trailing
+# bytes), so no two bodies are identical and the result cache never answers;
+# --repeat sends the identical bytes to measure cache hits instead
+
+async def run(url, body, concurrency, total, repeat=False):
+    client = AsyncHTTPClient(max_clients=concurrency)
+    latencies = []
+    errors = 0
+    pending = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for k in pending:
+            start = time.perf_counter()
+            try:
+                await client.fetch(HTTPRequest(url, method="POST", body=body if repeat else body + b"%012d" % k,
+                                               headers={"Content-Type": "application/octet-stream"},
+                                               request_timeout=600, connect_timeout=60))
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return np.array(latencies), errors, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="POST one image repeatedly and report latency percentiles")
+    parser.add_argument("--url", default="http://localhost:5000/recognize_plate_stream")
+    parser.add_argument("--image", default="Test/1.png")
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--requests", type=int, default=2048)
+    parser.add_argument("--repeat", action="store_true", help="send identical bodies (result cache hits)")
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        body = f.read()
+    latencies, errors, elapsed = asyncio.run(run(args.url, body, args.concurrency, args.requests, args.repeat))
+    if len(latencies) == 0:
+        print("all %d requests failed" % errors)
+        sys.exit(1)
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    print("%s concurrency=%d ok=%d errors=%d throughput=%.1f req/s p50=%.1fms p95=%.1fms p99=%.1fms" % (
+        args.url, args.concurrency, len(latencies), errors, len(latencies) / elapsed, p50, p95, p99))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import os
+import json
+import time
+import cv2
+import numpy as np
+from Deadline import *
+
+# helpers shared by the Flask, Tornado and gRPC front-ends
+
+ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
+# byte-identical frames (camera repeats, client retries) within PLATE_CACHE_TTL seconds
+# get the earlier read; 0 disables the cache. PLATE_CACHE_DB shares it between processes
+CACHE_TTL = float(os.environ.get('PLATE_CACHE_TTL', 10))
+CACHE_SIZE = int(os.environ.get('PLATE_CACHE_SIZE', 1024))
+CACHE_DB = os.environ.get('PLATE_CACHE_DB')
+
+def create_pipeline():
+    # PLATE_INFERENCE_HOST=1 keeps TensorFlow and the models out of this process:
+    # frames go to a single inference process through shared memory instead
+    if os.environ.get('PLATE_INFERENCE_HOST') == '1':
+        from Inference_Host import Inference_Host
+        pipeline = Inference_Host().start()
+    else:
+        from Plate_Pipeline import Plate_Pipeline
+        pipeline = Plate_Pipeline()
+    # PLATE_SCHEDULER=1 shares the pipeline fairly between cameras (X-Camera-Id)
+    if os.environ.get('PLATE_SCHEDULER') == '1':
+        from Camera_Scheduler import Camera_Scheduler
+        return Camera_Scheduler(pipeline)
+    return pipeline
+
+def create_cache():
+    if CACHE_TTL <= 0:
+        return None
+    from Result_Cache import Result_Cache
+    return Result_Cache(CACHE_TTL, CACHE_SIZE, CACHE_DB)
+
+def create_read_store():
+    # front-ends only query the history; the pipeline process writes it
+    from Read_Store import READ_STORE, Read_Store
+    return Read_Store(READ_STORE, writer=False) if READ_STORE else None
+
+def query_reads(store, get):
+    # get(name) returns a query parameter or None
+    if store is None:
+        return {"success": False, "message": "Read store disabled"}
+    number = lambda name: float(get(name)) if get(name) else None
+    try:
+        reads = store.query(plate=get('plate'), camera=get('camera'), since=number('since'), until=number('until'),
+                            limit=int(get('limit') or 100))
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    return {"success": True, "reads": reads}
+
+def service_stats(pipeline, cache=None, admission=None):
+    stats = pipeline.stats()
+    if cache is not None:
+        stats["cache"] = cache.stats()
+    if admission is not None:
+        stats["admission"] = admission.stats()
+    stats["deadlines"] = DEADLINES.stats()
+    return stats
+
+def allowed_file(filename):
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+def request_deadline(headers):
+    # X-Deadline-Ms: how many more milliseconds the client waits for the answer
+    return deadline_after(headers.get(DEADLINE_HEADER))
+
+def process_image(pipeline, image, camera=None, deadline=None):
+    start = time.time()
+    return DEADLINES.record(pipeline.process_image(image, camera, deadline), deadline, time.time() - start)
+
+def decode_and_process(pipeline, data, message, camera=None, cache=None, deadline=None):
+    if cache is not None:
+        return cache.get_or_compute(data, lambda: decode_and_process(pipeline, data, message, camera, None, deadline),
+                                    camera)
+    if expired(deadline):
+        return DEADLINES.record(timeout_result("decode"), deadline, 0.0)
+    nparr = np.frombuffer(data, np.uint8)
+    image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    if image is None:
+        return {"success": False, "message": message}
+    return process_image(pipeline, image, camera, deadline)
+
+def json_body(result):
+    # same bytes as flask.jsonify outside debug mode
+    return json.dumps(result, separators=(",", ":"), sort_keys=True) + "\n"
@@ -1,29 +1,119 @@
-from Extract_Character import *
-from Character_Recognizer import *
-from digit_recognizer_ import *
-from Car_Plate_Detection import *
-cr = Character_Recognizer()
-nr = Number_Recognizer()
-Ec = Extract_Characters()
-cp = Car_Plate_Detection()
-
-# Change Path to Picture
-image = cv2.imread('Test/1.png')
-
-PlateImg = cp.Detect_Plate(image)
-if PlateImg.all() == None:
-    print("No plate found in image")
-else:
-    numbers, characters = Ec.extract(PlateImg)
-    word = []
-    for i in range(len(numbers)):
-        word.append(nr.ocr(numbers[i]))
-
-    for i in range(len(characters)):
-        word.append(cr.ocr(characters[i]))
-    image = cv2.resize(image, (480, 480))
-    
-    
-    print(str(word))
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import multiprocessing
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+FIELDS = ['path', 'success', 'plate_number', 'message']
 
+def find_images(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for dirname, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield os.path.join(dirname, filename)
+        elif os.path.isfile(path):
+            yield path
+        else:
+            for match in sorted(glob.glob(path, recursive=True)):
+                if os.path.isfile(match) and match.lower().endswith(IMAGE_EXTENSIONS):
+                    yield match
+
+pipeline = None
+
+def init_worker(weight_store=None):
+    # each worker loads TensorFlow and the models once, then serves many images
+    global pipeline
+    from Plate_Pipeline import Plate_Pipeline, WEIGHT_STORE
+    pipeline = Plate_Pipeline(detectors=1, recognizers=1, weight_store=weight_store or WEIGHT_STORE)
+
+def recognize(path):
+    import cv2
+    image = cv2.imread(path)
+    if image is None:
+        result = {"success": False, "message": "Failed to read image"}
+    else:
+        result = pipeline.process_image(image)
+    return dict(path=path, **result)
+
+class Result_Writer:
+    def __init__(self, output, append):
+        self.file = open(output, 'a' if append else 'w', newline='') if output else sys.stdout
+        self.csv = None
+        if output and output.lower().endswith('.csv'):
+            self.csv = csv.DictWriter(self.file, fieldnames=FIELDS, extrasaction='ignore')
+            if not append or self.file.tell() == 0:
+                self.csv.writeheader()
+        self.jsonl = output is not None and self.csv is None
+
+    def write(self, result):
+        if self.csv is not None:
+            self.csv.writerow(result)
+        elif self.jsonl:
+            self.file.write(json.dumps(result) + '\n')
+        elif result['success']:
+            self.file.write("%s: %s\n" % (result['path'], str(result['plate_number'].split(','))))
+        else:
+            self.file.write("%s: %s\n" % (result['path'], result['message']))
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+def format_eta(seconds):
+    seconds = int(seconds)
+    return "%d:%02d:%02d" % (seconds // 3600, seconds % 3600 // 60, seconds % 60)
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognize plates in images, directories or globs")
+    parser.add_argument('paths', nargs='*', default=['Test/1.png'])
+    parser.add_argument('-o', '--output', help="write results to a .csv or .jsonl file instead of stdout")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--checkpoint', help="file of finished paths; defaults to OUTPUT.checkpoint")
+    parser.add_argument('--weight-store', help="load the models from this converted weight store "
+                                               "(python Weight_Store.py convert); defaults to PLATE_WEIGHT_STORE")
+    args = parser.parse_args()
+
+    checkpoint = args.checkpoint or (args.output + '.checkpoint' if args.output else None)
+    done = set()
+    if checkpoint and os.path.exists(checkpoint):
+        with open(checkpoint) as f:
+            done = set(line.rstrip('\n') for line in f)
+
+    paths = [p for p in find_images(args.paths) if p not in done]
+    total = len(paths)
+    if done:
+        print("resuming: %d already done, %d left" % (len(done), total), file=sys.stderr)
+
+    writer = Result_Writer(args.output, append=bool(done))
+    checkpoint_file = open(checkpoint, 'a') if checkpoint else None
+    start = time.time()
+    last_report = 0
+    with multiprocessing.Pool(min(args.workers, max(total, 1)), initializer=init_worker,
+                              initargs=(args.weight_store,)) as pool:
+        for i, result in enumerate(pool.imap_unordered(recognize, paths), 1):
+            writer.write(result)
+            if checkpoint_file:
+                checkpoint_file.write(result['path'] + '\n')
+                checkpoint_file.flush()
+            now = time.time()
+            if now - last_report >= 1 or i == total:
+                last_report = now
+                rate = i / max(now - start, 1e-9)
+                print("\r%d/%d images  %.1f img/s  ETA %s" % (i, total, rate, format_eta((total - i) / rate)),
+                      end='', file=sys.stderr, flush=True)
+    if total:
+        print(file=sys.stderr)
+    writer.close()
+    if checkpoint_file:
+        checkpoint_file.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import tornado.ioloop
+import tornado.web
+import tornado.httpserver
+from tornado.options import define, options
+from serving import *
+from Admission_Control import *
+
+define("port", default=5000, help="run on the given port", type=int)
+define("workers", default=os.cpu_count() or 4, help="threads running plate recognition", type=int)
+define("idle_timeout", default=3600, help="seconds an idle keep-alive connection is kept", type=int)
+
+class JsonHandler(tornado.web.RequestHandler):
+    def initialize(self, pipeline, executor, cache=None, admission=None, read_store=None):
+        self.pipeline = pipeline
+        self.executor = executor
+        self.cache = cache
+        self.admission = admission
+        self.read_store = read_store
+
+    def write_json(self, result):
+        # same body as flask.jsonify, so both front-ends answer byte for byte alike
+        self.set_header("Content-Type", "application/json")
+        self.finish(json_body(result))
+
+    async def recognize(self, data, message, stream=False):
+        # decoding and inference are CPU work; keep the event loop free for connections
+        camera = self.request.headers.get('X-Camera-Id')
+        try:
+            # a malformed X-Deadline-Ms is a JSON error, as in the Flask front-end
+            deadline = request_deadline(self.request.headers)
+            ticket = self.admission.admit(stream, deadline)
+            result = await tornado.ioloop.IOLoop.current().run_in_executor(
+                self.executor, self.admission.run, ticket,
+                lambda: decode_and_process(self.pipeline, data, message, camera, self.cache, deadline))
+        except Overloaded as e:
+            self.set_status(e.status)
+            self.set_header("Retry-After", str(e.retry_after))
+            result = e.body()
+        except Exception as e:
+            result = {"success": False, "message": f"Error: {str(e)}"}
+        self.write_json(result)
+
+class HealthHandler(JsonHandler):
+    def get(self):
+        self.write_json({"status": "healthy"})
+
+class StatsHandler(JsonHandler):
+    def get(self):
+        self.write_json(service_stats(self.pipeline, self.cache, self.admission))
+
+class ReadsHandler(JsonHandler):
+    async def get(self):
+        try:
+            result = await tornado.ioloop.IOLoop.current().run_in_executor(
+                self.executor, query_reads, self.read_store, lambda name: self.get_argument(name, None))
+        except Exception as e:
+            result = {"success": False, "message": f"Error: {str(e)}"}
+        self.write_json(result)
+
+class RecognizePlateHandler(JsonHandler):
+    async def post(self):
+        files = self.request.files.get('image')
+        if not files:
+            # tornado files a part with an empty filename under the form arguments
+            if 'image' in self.request.body_arguments:
+                return self.write_json({"success": False, "message": "No selected file"})
+            return self.write_json({"success": False, "message": "No image file provided"})
+
+        file = files[0]
+        if file.filename == '':
+            return self.write_json({"success": False, "message": "No selected file"})
+
+        if not allowed_file(file.filename):
+            return self.write_json({"success": False, "message": "Invalid file type"})
+
+        await self.recognize(file.body, "Failed to read image")
+
+class RecognizePlateStreamHandler(JsonHandler):
+    async def post(self):
+        await self.recognize(self.request.body, "Failed to decode image stream", stream=True)
+
+def make_app(pipeline, executor, cache=None, admission=None, read_store=None):
+    args = dict(pipeline=pipeline, executor=executor, cache=cache, admission=admission or Admission_Control(),
+                read_store=read_store)
+    return tornado.web.Application([
+        (r"/health", HealthHandler, args),
+        (r"/stats", StatsHandler, args),
+        (r"/reads", ReadsHandler, args),
+        (r"/recognize_plate", RecognizePlateHandler, args),
+        (r"/recognize_plate_stream", RecognizePlateStreamHandler, args),
+    ])
+
+def main():
+    tornado.options.parse_command_line()
+    pipeline = create_pipeline()
+    executor = ThreadPoolExecutor(max_workers=options.workers)
+    app = make_app(pipeline, executor, create_cache(), read_store=create_read_store())
+    server = tornado.httpserver.HTTPServer(app,
+                                           idle_connection_timeout=options.idle_timeout,
+                                           max_body_size=64 * 1024 * 1024)
+    server.listen(options.port)
+    logging.info(f"Plate recognition server started on port {options.port}")
+    tornado.ioloop.IOLoop.current().start()
+
+if __name__ == "__main__":
+    main()